@@ -0,0 +1,163 @@
+"""Shared assembunny computer used by the 2016 puzzles (days 12, 23 and 25).
+
+Days import this with::
+
+    sys.path.insert(0, str(Path(__file__).parents[2]))
+    from assembunny import Computer, parse
+
+Before running, the program is passed through a peephole optimizer that
+replaces `inc`/`dec`/`jnz` add loops and nested multiply loops with single
+superinstructions. The optimized program is rebuilt whenever `tgl` modifies
+the source, so self-modifying programs still run correctly.
+"""
+
+
+def maybe_int(x):
+    try:
+        return int(x)
+    except ValueError:
+        return x
+
+
+def parse(text):
+    """
+    >>> list(parse('cpy 41 a\\ninc a\\njnz a 2'))
+    [('cpy', 41, 'a'), ('inc', 'a'), ('jnz', 'a', 2)]
+    """
+    for line in text.strip().split("\n"):
+        yield tuple(maybe_int(x) for x in line.strip().split())
+
+
+def _match_add(window):
+    """Match `x += y; y = 0` written as an inc/dec loop over `y`"""
+    match window:
+        case [(op, str(x)), ("dec", str(y)), ("jnz", str(z), -2)]:
+            pass
+        case [("dec", str(y)), (op, str(x)), ("jnz", str(z), -2)]:
+            pass
+        case _:
+            return None
+    if op in ("inc", "dec") and y == z and x != y:
+        return x, y, 1 if op == "inc" else -1
+
+
+def _match_mul(window):
+    """Match `x += s * y; t = 0; y = 0` written as nested inc/dec loops"""
+    match window:
+        case [("cpy", s, str(t)), *inner, ("dec", str(y)), ("jnz", str(z), -5)]:
+            if (add := _match_add(inner)) is None:
+                return None
+            x, u, sign = add
+            if u == t and y == z and y not in (x, t) and s not in (x, t, y):
+                return x, s, t, y, sign
+
+
+def optimize(program):
+    """Return `program` with loops replaced by superinstructions
+
+    Superinstructions replace only the first instruction of the loop, so jumps
+    into the middle of a loop still land on the original code. Invalid
+    instructions produced by `tgl` become `nop`, so they are skipped.
+
+    >>> optimize([('inc', 'a'), ('dec', 'b'), ('jnz', 'b', -2)])[0]
+    ('add', 'a', 'b', 1)
+    >>> code = list(parse('cpy b c\\ninc a\\ndec c\\njnz c -2\\ndec d\\njnz d -5'))
+    >>> optimize(code)[:2]
+    [('mul', 'a', 'b', 'c', 'd', 1), ('add', 'a', 'c', 1)]
+    >>> optimize([('cpy', 'a', 2), ('inc', 'a')])
+    [('nop',), ('inc', 'a')]
+    """
+    optimized = list(program)
+    for i in range(len(program)):
+        if (mul := _match_mul(program[i : i + 6])) is not None:
+            optimized[i] = ("mul", *mul)
+        elif (add := _match_add(program[i : i + 3])) is not None:
+            optimized[i] = ("add", *add)
+        else:
+            match program[i]:
+                case ("cpy", _, int()) | ("inc", int()) | ("dec", int()):
+                    optimized[i] = ("nop",)
+    return optimized
+
+
+def toggle(instruction):
+    match instruction:
+        case "inc", a:
+            return ("dec", a)
+        case _, a:
+            return ("inc", a)
+        case "jnz", a, b:
+            return ("cpy", a, b)
+        case _, a, b:
+            return ("jnz", a, b)
+
+
+class Computer:
+    def __init__(self, **registers):
+        self.reset(**registers)
+
+    def reset(self, **registers):
+        self.registers = {x: 0 for x in "abcd"}
+        self.registers.update(registers)
+
+    def execute(self, program):
+        for _ in self.run(program):
+            pass
+
+    def run(self, program):
+        """Run `program`, yielding the values it transmits with `out`"""
+        program = list(program)
+        code = optimize(program)
+        pc = 0
+        registers = self.registers
+        while 0 <= pc < len(code):
+            match code[pc]:
+                case "cpy", x, y:
+                    registers[y] = x if isinstance(x, int) else registers[x]
+                case "inc", x:
+                    registers[x] += 1
+                case "dec", x:
+                    registers[x] -= 1
+                case "jnz", x, n:
+                    if (x if isinstance(x, int) else registers[x]) != 0:
+                        pc += (n if isinstance(n, int) else registers[n]) - 1
+                case "add", x, y, sign if registers[y] > 0:
+                    registers[x] += sign * registers[y]
+                    registers[y] = 0
+                    pc += 2
+                case "mul", x, s, t, y, sign if registers[y] > 0 and (
+                    factor := s if isinstance(s, int) else registers[s]
+                ) > 0:
+                    registers[x] += sign * factor * registers[y]
+                    registers[t] = 0
+                    registers[y] = 0
+                    pc += 5
+                case ("add", *_) | ("mul", *_):
+                    # The loop would not terminate normally, so run it as written.
+                    # Loops only ever start with one of these instructions.
+                    match program[pc]:
+                        case "cpy", x, y:
+                            registers[y] = x if isinstance(x, int) else registers[x]
+                        case "inc", x:
+                            registers[x] += 1
+                        case "dec", x:
+                            registers[x] -= 1
+                case "tgl", n:
+                    n = pc + (n if isinstance(n, int) else registers[n])
+                    if 0 <= n < len(program):
+                        program[n] = toggle(program[n])
+                        code = optimize(program)
+                case "out", x:
+                    yield x if isinstance(x, int) else registers[x]
+                case ("nop",):
+                    pass
+                case _:
+                    raise RuntimeError(program[pc])
+            pc += 1
+        assert pc > 0
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -1,5 +1,11 @@
+import sys
 from hashlib import md5
-from itertools import count
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[2]))
+from md5_pipeline import index_ranges, ordered_map  # noqa: E402
+
+BATCH_SIZE = 200_000
 
 
 def parse(text):
@@ -10,43 +16,57 @@ def parse(text):
     return text.strip()
 
 
-def next(door_id, n):
-    for i in count(n):
-        digest = md5(f"{door_id}{i}".encode("ascii")).hexdigest()
-        if digest.startswith("00000"):
-            return i, digest[5], digest[6]
+def find_hits(task):
+    """Return `(i, digest[5], digest[6])` for each interesting index in the range"""
+    door_id, (start, stop) = task
+    prefix = md5(door_id.encode("ascii"))
+    hits = []
+    for i in range(start, stop):
+        hasher = prefix.copy()
+        hasher.update(str(i).encode("ascii"))
+        digest = hasher.digest()
+        # Five leading hex zeros
+        if digest[0] == 0 and digest[1] == 0 and digest[2] < 16:
+            text = hasher.hexdigest()
+            hits.append((i, text[5], text[6]))
+    return hits
+
+
+def search(door_id, use_multiprocessing=True):
+    """Yield the interesting hashes for `door_id` in index order"""
+    tasks = ((door_id, x) for x in index_ranges(BATCH_SIZE))
+    for hits in ordered_map(find_hits, tasks, use_multiprocessing):
+        yield from hits
 
 
-def part_1(text):
+def part_1(text, use_multiprocessing=True):
     """
     >>> part_1(EXAMPLE_TEXT)
     '18f47a30'
     """
-    n = -1
     door_id = parse(text)
     password = []
-    for _ in range(8):
-        n, c, _ = next(door_id, n + 1)
+    for _, c, _ in search(door_id, use_multiprocessing):
         password.append(c)
-    return "".join(password)
+        if len(password) == 8:
+            return "".join(password)
 
 
-def part_2(text):
+def part_2(text, use_multiprocessing=True):
     """
     >>> part_2(EXAMPLE_TEXT)
     '05ace8e3'
     """
-    n = -1
     door_id = parse(text)
     password = [None] * 8
-    while None in password:
-        n, p, c = next(door_id, n + 1)
+    for _, p, c in search(door_id, use_multiprocessing):
         if not ("0" <= p < "8"):
             continue
         p = int(p)
         if password[p] is None:
             password[p] = c
-    return "".join(password)
+            if None not in password:
+                return "".join(password)
 
 
 if __name__ == "__main__":
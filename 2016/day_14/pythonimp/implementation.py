@@ -1,19 +1,33 @@
 import re
-from collections import deque
-from hashlib import md5
-from itertools import count
+import sys
+from collections import defaultdict, deque
+from pathlib import Path
 
-# md5(text).hexdigest()
+sys.path.insert(0, str(Path(__file__).parents[2]))
+from md5_pipeline import index_ranges, ordered_map, salted_hexdigests  # noqa: E402
 
+TRIPLE = re.compile(r"(.)\1\1")
+QUINTUPLE = re.compile(r"(.)\1{4}")
+WINDOW = 1000
 
-def hashof(i, seed, stretch):
-    text = f"{seed}{i}"
-    for _ in range(stretch + 1):
-        text = md5(text.encode("ascii")).hexdigest()
-    return text
 
+def hash_features(task):
+    """Return `(hash, triple character, quintuple characters)` for each index"""
+    seed, stretch, (start, stop) = task
+    features = []
+    for text in salted_hexdigests(seed, start, stop, stretch):
+        triple = TRIPLE.search(text)
+        features.append(
+            (
+                text,
+                triple.group(1) if triple else None,
+                "".join(set(QUINTUPLE.findall(text))),
+            )
+        )
+    return features
 
-def generate_codes(seed, stretch=0):
+
+def generate_codes(seed, stretch=0, use_multiprocessing=True):
     """
     >>> seed = parse(EXAMPLE_TEXT)
     >>> items = list(x for (i, x) in zip(range(64), generate_codes(seed)))
@@ -22,22 +36,27 @@ def generate_codes(seed, stretch=0):
     >>> items[-1][0]
     22728
     """
-    hashes = deque()
-    triple = re.compile(r"(.)\1\1")
-    # quintuple = re.compile(r"(.)\1\1\1\1")
-    for i in count():
-        if not len(hashes):
-            hashes.append(hashof(i, seed, stretch))
-        candidate = hashes.popleft()
-        if (m := triple.search(candidate)) is not None:
-            target = m.group(1) * 5
-            for j in range(1000):
-                if len(hashes) == j:
-                    hashes.append(hashof(i + j + 1, seed, stretch))
-                # if (m := quintuple.search(hashes[j])) and m.group(1) == target:
-                if target in hashes[j]:
-                    yield i, candidate, target
-                    break
+    batch_size = max(100, 20_000 // (stretch + 1))
+    tasks = ((seed, stretch, x) for x in index_ranges(batch_size))
+    # Candidates waiting for the next WINDOW hashes to be known
+    candidates = deque()
+    # Character -> indices of upcoming hashes containing five of it in a row
+    quintuples = defaultdict(deque)
+    j = 0
+    for features in ordered_map(hash_features, tasks, use_multiprocessing):
+        for text, triple, quints in features:
+            for c in quints:
+                quintuples[c].append(j)
+            candidates.append((j, text, triple))
+            if len(candidates) > WINDOW:
+                i, candidate, c = candidates.popleft()
+                if c is not None:
+                    found = quintuples[c]
+                    while found and found[0] <= i:
+                        found.popleft()
+                    if found:
+                        yield i, candidate, c * 5
+            j += 1
 
 
 def parse(text):
@@ -48,23 +67,25 @@ def parse(text):
     return text.strip()
 
 
-def part_1(text):
+def part_1(text, use_multiprocessing=True):
     """
     >>> part_1(EXAMPLE_TEXT) # 12292 is too low also 12291 ???
     22728
     """
     seed = parse(text)
-    items = list(x for (i, x) in zip(range(64), generate_codes(seed)))
+    codes = generate_codes(seed, 0, use_multiprocessing)
+    items = list(x for (i, x) in zip(range(64), codes))
     return items[-1][0]
 
 
-def part_2(text):
+def part_2(text, use_multiprocessing=True):
     """
     >>> part_2(EXAMPLE_TEXT)
     22551
     """
     seed = parse(text)
-    items = list(x for (i, x) in zip(range(64), generate_codes(seed, stretch=2016)))
+    codes = generate_codes(seed, 2016, use_multiprocessing)
+    items = list(x for (i, x) in zip(range(64), codes))
     return items[-1][0]
 
 
@@ -0,0 +1,70 @@
+"""Batched, parallel MD5 searches used by the 2016 puzzles (days 5 and 14).
+
+Days import this with::
+
+    sys.path.insert(0, str(Path(__file__).parents[2]))
+    from md5_pipeline import ordered_map, salted_hexdigests
+
+Work is split into index ranges that are farmed out to worker processes, and
+the results are streamed back in index order. Hashes of `f"{salt}{i}"` reuse
+the digest state of the salt via `md5().copy()`.
+"""
+from collections import deque
+from hashlib import md5
+from itertools import count
+from multiprocessing import Pool, cpu_count
+
+
+def salted_hexdigests(salt, start, stop, stretch=0):
+    """Yield the (stretched) hex digest of `f"{salt}{i}"` for `i` in `range(start, stop)`
+
+    >>> list(salted_hexdigests('abc', 18, 19))
+    ['0034e0923cc38887a57bd7b1d4f953df']
+    >>> list(salted_hexdigests('abc', 0, 1, stretch=2016))
+    ['a107ff634856bb300138cac6568c0f24']
+    """
+    prefix = md5(salt.encode("ascii"))
+    for i in range(start, stop):
+        hasher = prefix.copy()
+        hasher.update(str(i).encode("ascii"))
+        text = hasher.hexdigest()
+        for _ in range(stretch):
+            text = md5(text.encode("ascii")).hexdigest()
+        yield text
+
+
+def index_ranges(batch_size, start=0):
+    """Yield `(start, stop)` pairs covering the integers from `start` upwards"""
+    for i in count(start, batch_size):
+        yield i, i + batch_size
+
+
+def ordered_map(function, tasks, use_multiprocessing=True, processes=None):
+    """Yield `function(task)` for each of the (possibly infinite) `tasks`, in order
+
+    Only a couple of tasks per worker are in flight at any time, so the
+    consumer can stop early without the pool running ahead unboundedly.
+    """
+    if not use_multiprocessing:
+        yield from map(function, tasks)
+        return
+    processes = processes or cpu_count()
+    tasks = iter(tasks)
+    with Pool(processes) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(function, (task,)))
+            if len(pending) >= 2 * processes:
+                break
+        while pending:
+            result = pending.popleft().get()
+            for task in tasks:
+                pending.append(pool.apply_async(function, (task,)))
+                break
+            yield result
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
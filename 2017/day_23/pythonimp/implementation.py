@@ -1,5 +1,5 @@
-from collections import defaultdict, deque
-from math import sqrt
+from collections import defaultdict
+from math import isqrt
 
 
 def maybe_int(x):
@@ -22,6 +22,134 @@ def parse(text):
         yield cmd, *(maybe_int(x) for x in args)
 
 
+def divisor_pairs(n):
+    """Yield every `(p, q)` with `p * q == n` for `n >= 1`
+
+    >>> sorted(divisor_pairs(12))
+    [(1, 12), (2, 6), (3, 4), (4, 3), (6, 2), (12, 1)]
+    """
+    for p in range(1, isqrt(n) + 1):
+        if n % p == 0:
+            yield p, n // p
+            if p * p != n:
+                yield n // p, p
+
+
+def _divisor_test_roles(loop):
+    """Match `do { if d * e == b: f = x; e += 1 } while e != b`
+
+    Returns the registers (or values) playing `(g, d, e, b, f, x)`, where `g`
+    is scratch, or None if `loop` has a different shape.
+    """
+    match loop:
+        case [
+            ("set", str(g), str(d)),
+            ("mul", g1, str(e)),
+            ("sub", g2, b),
+            ("jnz", g3, 2),
+            ("set", str(f), x),
+            ("sub", e1, -1),
+            ("set", g4, e2),
+            ("sub", g5, b1),
+            ("jnz", g6, -8),
+        ] if (
+            g == g1 == g2 == g3 == g4 == g5 == g6
+            and e == e1 == e2
+            and b == b1
+            and len({g, d, e, f, b}) == 5
+            and x not in (g, d, e)
+        ):
+            return g, d, e, b, f, x
+
+
+def _match_divisor_test(loop, get, registers):
+    """Summarize the divisor test loop over `e`
+
+    Returns a function that runs the whole loop and returns the number of
+    `mul` instructions it would have executed, or None if the loop would not
+    terminate normally.
+
+    >>> text = '''set b 100
+    ... set d 1
+    ... set e 2
+    ... set g d
+    ... mul g e
+    ... sub g b
+    ... jnz g 2
+    ... set h 1
+    ... sub e -1
+    ... set g e
+    ... sub g b
+    ... jnz g -8'''
+    >>> Tablet().execute(parse(text), summarize=True)
+    (98, 0)
+    >>> Tablet().execute(parse(text.replace("d 1", "d 4")), summarize=True)
+    (98, 1)
+    """
+    if (roles := _divisor_test_roles(loop)) is None:
+        return None
+    g, d, e, b, f, x = roles
+
+    def summary():
+        b_value = get(b)
+        e_value = registers[e]
+        d_value = registers[d]
+        if not (0 < b_value and e_value < b_value):
+            return None
+        # The loop only tries values of `e` below `b`
+        if (
+            d_value
+            and b_value % d_value == 0
+            and e_value <= b_value // d_value < b_value
+        ):
+            registers[f] = get(x)
+        registers[e] = b_value
+        registers[g] = 0
+        return b_value - e_value
+
+    return summary
+
+
+def _match_divisor_search(loop, get, registers):
+    """Summarize the divisor test loop over `e` nested in a loop over `d` up to `b`"""
+    match loop:
+        case [
+            ("set", e, int(k)),
+            *inner,
+            ("sub", d, -1),
+            ("set", g, d1),
+            ("sub", g1, b),
+            ("jnz", g2, -13),
+        ]:
+            roles = _divisor_test_roles(inner)
+        case _:
+            return None
+    if roles is None or roles[:4] != (g, d, e, b) or not (d == d1 and g == g1 == g2):
+        return None
+    f, x = roles[4:]
+
+    def summary():
+        b_value = get(b)
+        d_value = registers[d]
+        if not (0 < d_value < b_value and 0 < k < b_value):
+            return None
+        for p, q in divisor_pairs(b_value):
+            if d_value <= p < b_value and k <= q < b_value:
+                registers[f] = get(x)
+                break
+        registers[d] = registers[e] = b_value
+        registers[g] = 0
+        return (b_value - d_value) * (b_value - k)
+
+    return summary
+
+
+LOOP_SUMMARIES = [_match_divisor_search, _match_divisor_test]
+
+# Number of times a backward jump is taken before trying to summarize its loop
+HOT_LOOP = 8
+
+
 class Tablet:
     def __init__(self, **registers):
         self.reset(**registers)
@@ -30,14 +158,28 @@ class Tablet:
         self.registers = defaultdict(int)
         self.registers.update(registers)
 
-    def execute(self, code):
+    def execute(self, code, summarize=False):
+        """Run `code`, returning the number of `mul` executed and register h
+
+        With `summarize`, loops that run hot are matched against
+        `LOOP_SUMMARIES` and, where one applies, run in closed form from then on.
+        """
+
         def get(r):
             return r if (isinstance(r, int)) else self.registers[r]
 
         code = list(code)
+        summaries = [None] * len(code)
+        ends = [None] * len(code)
+        hits = defaultdict(int)
         mults = 0
         pc = 0
         while 0 <= pc < len(code):
+            if (summary := summaries[pc]) is not None:
+                if (count := summary()) is not None:
+                    mults += count
+                    pc = ends[pc] + 1
+                    continue
             match code[pc]:
                 case "set", a, b:
                     self.registers[a] = get(b)
@@ -48,12 +190,28 @@ class Tablet:
                     self.registers[a] *= get(b)
                 case "jnz", a, b:
                     if get(a) != 0:
-                        pc += get(b) - 1
+                        offset = get(b)
+                        if summarize and offset < 0:
+                            hits[pc] += 1
+                            if hits[pc] == HOT_LOOP:
+                                self._summarize(code, pc + offset, pc, summaries, ends)
+                        pc += offset - 1
                 case _:
                     raise ValueError((code[pc]))
             pc += 1
         return mults, self.registers["h"]
 
+    def _summarize(self, code, start, end, summaries, ends):
+        def get(r):
+            return r if (isinstance(r, int)) else self.registers[r]
+
+        for match_loop in LOOP_SUMMARIES:
+            summary = match_loop(code[start : end + 1], get, self.registers)
+            if summary is not None:
+                summaries[start] = summary
+                ends[start] = end
+                return
+
 
 def part_1(text):
     """
@@ -66,27 +224,14 @@ def part_1(text):
     return mults
 
 
-def is_prime(x):
-    for n in range(2, int(sqrt(x))):
-        if x % n == 0:
-            return False
-    return True
-
-
 def part_2(text):
     """
     >>> part_2(EXAMPLE_TEXT)
     907
     """
-    # After some painful deciphering, turns out code counts from
-    # x = b to c (inclusive) and increments h if x is *not* prime.
-    count = 0
-    b = 79 * 100 + 100_000
-    c = b + 17_000
-    for i in range(b, c + 1, 17):
-        if not is_prime(i):
-            count += 1
-    return count
+    tablet = Tablet(a=1)
+    _, h = tablet.execute(parse(text), summarize=True)
+    return h
 
 
 if __name__ == "__main__":
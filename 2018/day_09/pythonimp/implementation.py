@@ -1,4 +1,4 @@
-from collections import deque
+from array import array
 
 
 def parse(text):
@@ -11,18 +11,50 @@ def parse(text):
 
 
 def play(n_players, last_marble_score):
-    board = deque([0])
-    players = deque([0] * n_players)
-    for marble in range(1, last_marble_score + 1):
-        if marble % 23 == 0:
-            players[0] += marble
-            board.rotate(7)
-            players[0] += board.popleft()
+    """Return the score of each player once the last marble has been placed
+
+    The circle is kept as a queue that starts just clockwise of the current
+    marble and ends with it. Placing a marble moves one marble from the front
+    to the back and appends the new one, and every 23rd marble takes the
+    marble 7 from the back and moves the 6 after it to the front. The queue
+    lives in a flat array that only ever grows at the back, so the 22 marbles
+    between scoring ones are placed with a couple of slice assignments.
+
+    Only the most recent writes are ever read back from the end of the queue,
+    and the front never gets past `cap`. So once the back of the queue reaches
+    `cap` it is wound back there at the end of each block, and the array
+    stays at about 16 / 23 of a slot per marble.
+
+    >>> play(9, 25)
+    [0, 0, 0, 0, 32, 0, 0, 0, 0]
+    """
+    scores = [0] * n_players
+    n_blocks = last_marble_score // 23
+    # Room to move 6 marbles to the front of the queue
+    head = tail = 6
+    cap = head + 16 * n_blocks + 6
+    queue = array("I", [0]) * (cap + 2 * 23)
+    tail += 1
+    for base in range(0, 23 * n_blocks, 23):
+        if tail - head >= 22:
+            # None of the marbles moved to the back are placed in this block
+            queue[tail : tail + 44 : 2] = queue[head : head + 22]
+            queue[tail + 1 : tail + 44 : 2] = array("I", range(base + 1, base + 23))
+            head += 22
+            tail += 44
         else:
-            board.rotate(-2)
-            board.appendleft(marble)
-        players.rotate(-1)
-    return players
+            for marble in range(base + 1, base + 23):
+                queue[tail] = queue[head]
+                queue[tail + 1] = marble
+                head += 1
+                tail += 2
+        marble = base + 23
+        scores[(marble - 1) % n_players] += marble + queue[tail - 8]
+        queue[head - 6 : head] = queue[tail - 6 : tail]
+        head -= 6
+        queue[tail - 8] = queue[tail - 7]
+        tail = min(tail - 7, cap)
+    return scores
 
 
 def part_1(text):
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def parse(text):
     """
     >>> parse(EXAMPLE_TEXT)
@@ -28,67 +31,66 @@ def power_level(x, y, sn):
     return power_level - 5
 
 
-def blockify_x(target, powers, y, size):
-    current_block = sum(powers[x, y] for x in range(1, size + 1))
-    target[(1, y)] = current_block
-    for x in range(2, 300 + 1 - size):
-        current_block = current_block - powers[x - 1, y] + powers[x + size - 1, y]
-        target[x, y] = current_block
-
-
-def blockify_y(target, x_blocked, x, size):
-    current_block = sum(x_blocked[x, y] for y in range(1, size + 1))
-    target[(x, 1)] = current_block
-    for y in range(2, 300 + 1 - size):
-        current_block = current_block - x_blocked[x, y - 1] + x_blocked[x, y + size - 1]
-        target[x, y] = current_block
+def power_grid(serial_number, dim=300):
+    """Power levels of a `dim` by `dim` grid, indexed `[y - 1, x - 1]`
 
+    >>> print(power_grid(57)[78, 121], power_grid(39)[195, 216], power_grid(71)[152, 100])
+    -5 0 4
+    """
+    rack_id = np.arange(1, dim + 1) + 10
+    y = np.arange(1, dim + 1)[:, np.newaxis]
+    powers = (rack_id * y + serial_number) * rack_id
+    return (powers // 100) % 10 - 5
 
-def blockify(powers, size):
-    x_blocked = {}
-    for y in range(1, 301):
-        blockify_x(x_blocked, powers, y, size)
 
-    blocked = {}
-    for x in range(1, 301 - size):
-        blockify_y(blocked, x_blocked, x, size)
+def summed_area_table(powers):
+    """`table[y, x]` is the sum of `powers[:y, :x]`"""
+    table = np.zeros((powers.shape[0] + 1, powers.shape[1] + 1), dtype=np.int64)
+    table[1:, 1:] = powers.cumsum(axis=0).cumsum(axis=1)
+    return table
 
-    return blocked
 
+def best_square(table, size):
+    """Return `(power, (x, y))` for the `size` square with the most power
 
-def part_1(text):
+    >>> best_square(summed_area_table(power_grid(42)), 3)
+    (30, (21, 61))
+    """
+    # The sum of every square at once, indexed by its top left corner
+    sums = (
+        table[size:, size:]
+        - table[:-size, size:]
+        - table[size:, :-size]
+        + table[:-size, :-size]
+    )
+    y, x = np.unravel_index(np.argmax(sums), sums.shape)
+    return int(sums[y, x]), (int(x) + 1, int(y) + 1)
+
+
+def part_1(text, dim=300):
     """
     >>> part_1('18')
     (33, 45)
     """
-    serial_number = parse(text)
-    powers = {}
-    for x in range(1, 301):
-        for y in range(1, 301):
-            powers[x, y] = power_level(x, y, serial_number)
+    table = summed_area_table(power_grid(parse(text), dim))
+    _, xy = best_square(table, 3)
+    return xy
 
-    blocked = blockify(powers, 3)
-    return max(blocked, key=lambda x: blocked[x])
 
-
-def part_2(text):
+def part_2(text, dim=300):
     """
     >>> part_2("18")
     (90, 269, 16)
+    >>> part_2("42")
+    (232, 251, 12)
     """
-    serial_number = parse(text)
-    powers = {}
-    for x in range(1, 301):
-        for y in range(1, 301):
-            powers[x, y] = power_level(x, y, serial_number)
-
+    table = summed_area_table(power_grid(parse(text), dim))
     max_power = 0
     best_config = None
-    for size in range(1, 300):
-        blocked = blockify(powers, size)
-        xy = max(blocked, key=lambda x: blocked[x])
-        if blocked[xy] > max_power:
-            max_power = blocked[xy]
+    for size in range(1, dim + 1):
+        power, xy = best_square(table, size)
+        if power > max_power:
+            max_power = power
             best_config = xy + (size,)
     return best_config
 
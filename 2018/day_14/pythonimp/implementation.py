@@ -1,45 +1,82 @@
+from itertools import islice
+
+
 def parse(text):
     return int(text.strip())
 
 
-def step(recipes, indices):
-    recipe_sum = sum(recipes[i] for i in indices)
-    new_recipes = [int(x) for x in str(recipe_sum)]
-    recipes.extend(new_recipes)
-    new_indices = [(i + 1 + recipes[i]) % len(recipes) for i in indices]
-    return recipes, new_indices
+def recipe_scores():
+    """Yield the score of every recipe on the scoreboard, in order, forever
+
+    >>> list(islice(recipe_scores(), 20))
+    [3, 7, 1, 0, 1, 0, 1, 2, 4, 5, 1, 5, 8, 9, 1, 6, 7, 7, 9, 2]
+    """
+    recipes = bytearray([3, 7])
+    yield from recipes
+    a, b = 0, 1
+    while True:
+        score = recipes[a] + recipes[b]
+        # The sum of two digits is at most 18, so has at most two digits
+        if score >= 10:
+            recipes.append(1)
+            yield 1
+            score -= 10
+        recipes.append(score)
+        yield score
+        n = len(recipes)
+        a = (a + 1 + recipes[a]) % n
+        b = (b + 1 + recipes[b]) % n
+
+
+def pattern_automaton(pattern):
+    """Transition table for finding `pattern` in a stream of digits
+
+    `table[k][x]` is how much of `pattern` has been matched after digit `x`
+    arrives when `k` digits of it had been matched; it is built from the
+    Knuth-Morris-Pratt failure function.
+
+    >>> table = pattern_automaton([1, 0, 1])
+    >>> [table[k][1] for k in range(3)], [table[k][0] for k in range(3)]
+    ([1, 1, 3], [0, 2, 0])
+    """
+    table = [[0] * 10 for _ in pattern]
+    table[0][pattern[0]] = 1
+    # The state we would be in after the matched part, less its first digit
+    fallback = 0
+    for k in range(1, len(pattern)):
+        table[k] = table[fallback].copy()
+        table[k][pattern[k]] = k + 1
+        fallback = table[fallback][pattern[k]]
+    return table
 
 
 def part_1(text):
     """
     >>> part_1(EXAMPLE_TEXT)
     '5158916779'
+    >>> part_1('2018')
+    '5941429882'
     """
     steps = parse(text)
-    recipes = [3, 7]
-    indices = [0, 1]
-    while len(recipes) < steps + 10:
-        recipes, indices = step(recipes, indices)
-    return ''.join(str(x) for x in recipes[steps : steps + 10])
+    return ''.join(str(x) for x in islice(recipe_scores(), steps, steps + 10))
 
 
 def part_2(text):
     """
     >>> part_2("92510")
     18
+    >>> part_2("59414")
+    2018
 
     20283721
     """
     pattern = [int(x) for x in text.strip()]
-    n = len(pattern)
-    recipes = [3, 7]
-    indices = [0, 1]
-    while True:
-        recipes, indices = step(recipes, indices)
-        if recipes[-n:] == pattern:
-            return len(recipes) - n
-        if recipes[-(n + 1) : -1] == pattern:
-            return len(recipes) - n - 1
+    table = pattern_automaton(pattern)
+    matched = 0
+    for i, x in enumerate(recipe_scores()):
+        matched = table[matched][x]
+        if matched == len(pattern):
+            return i + 1 - len(pattern)
 
 
 if __name__ == "__main__":
@@ -1,3 +1,10 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[2]))
+from elfcode import apply, opcodes  # noqa: E402
+
+
 def parse_example(text):
     before, command, after = text.split('\n')
     before = tuple(
@@ -26,64 +33,6 @@ def parse(text):
     return examples, code
 
 
-opcodes = [
-    'addr',
-    'addi',
-    'mulr',
-    'muli',
-    'banr',
-    'bani',
-    'borr',
-    'bori',
-    'setr',
-    'seti',
-    'gtir',
-    'gtri',
-    'gtrr',
-    'eqir',
-    'eqri',
-    'eqrr',
-]
-
-
-def apply(opcode, A, B, C, registers):
-    match opcode:
-        case 'addr':
-            registers[C] = registers[A] + registers[B]
-        case 'addi':
-            registers[C] = registers[A] + B
-        case 'mulr':
-            registers[C] = registers[A] * registers[B]
-        case 'muli':
-            registers[C] = registers[A] * B
-        case 'banr':
-            registers[C] = registers[A] & registers[B]
-        case 'bani':
-            registers[C] = registers[A] & B
-        case 'borr':
-            registers[C] = registers[A] | registers[B]
-        case 'bori':
-            registers[C] = registers[A] | B
-        case 'setr':
-            registers[C] = registers[A]
-        case 'seti':
-            registers[C] = A
-        case 'gtir':
-            registers[C] = int(A > registers[B])
-        case 'gtri':
-            registers[C] = int(registers[A] > B)
-        case 'gtrr':
-            registers[C] = int(registers[A] > registers[B])
-        case 'eqir':
-            registers[C] = int(A == registers[B])
-        case 'eqri':
-            registers[C] = int(registers[A] == B)
-        case 'eqrr':
-            registers[C] = int(registers[A] == registers[B])
-        case _:
-            raise ValueError(opcode)
-
-
 def part_1(text):
     """
     >>> part_1(INPUT_TEXT)
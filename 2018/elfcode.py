@@ -0,0 +1,377 @@
+"""Shared ElfCode (wrist device) machine used by the 2018 puzzles (days 16, 19, 21).
+
+Days import this with::
+
+    sys.path.insert(0, str(Path(__file__).parents[2]))
+    from elfcode import compile_program, parse
+
+`apply` interprets one instruction at a time. `compile_program` instead turns a
+whole `#ip` program into a Python generator function: registers live in
+locals, reads of the ip register and immediates are folded into constants,
+and each instruction is the entry point of a straight line run of code that
+lasts until the ip register is written. Well known inner loops are replaced by
+their closed form (see `IDIOMS`).
+"""
+
+
+def parse_code(text):
+    opcode, *rest = (x.strip() for x in text.split())
+    return (opcode,) + tuple(int(x) for x in rest)
+
+
+def parse(text):
+    """
+    >>> parse('#ip 0\\nseti 5 0 1')
+    [('#ip', 0), ('seti', 5, 0, 1)]
+    """
+    return [parse_code(x) for x in text.strip().split('\n')]
+
+
+def split_ip(code):
+    """Return `(ip_reg, instructions)` for a program starting with `#ip`"""
+    (ip_command, ip_reg), *code = code
+    assert ip_command == '#ip'
+    return ip_reg, code
+
+
+opcodes = [
+    'addr',
+    'addi',
+    'mulr',
+    'muli',
+    'banr',
+    'bani',
+    'borr',
+    'bori',
+    'setr',
+    'seti',
+    'gtir',
+    'gtri',
+    'gtrr',
+    'eqir',
+    'eqri',
+    'eqrr',
+]
+
+
+def apply(opcode, A, B, C, registers):
+    match opcode:
+        case 'addr':
+            registers[C] = registers[A] + registers[B]
+        case 'addi':
+            registers[C] = registers[A] + B
+        case 'mulr':
+            registers[C] = registers[A] * registers[B]
+        case 'muli':
+            registers[C] = registers[A] * B
+        case 'banr':
+            registers[C] = registers[A] & registers[B]
+        case 'bani':
+            registers[C] = registers[A] & B
+        case 'borr':
+            registers[C] = registers[A] | registers[B]
+        case 'bori':
+            registers[C] = registers[A] | B
+        case 'setr':
+            registers[C] = registers[A]
+        case 'seti':
+            registers[C] = A
+        case 'gtir':
+            registers[C] = int(A > registers[B])
+        case 'gtri':
+            registers[C] = int(registers[A] > B)
+        case 'gtrr':
+            registers[C] = int(registers[A] > registers[B])
+        case 'eqir':
+            registers[C] = int(A == registers[B])
+        case 'eqri':
+            registers[C] = int(registers[A] == B)
+        case 'eqrr':
+            registers[C] = int(registers[A] == registers[B])
+        case _:
+            raise ValueError(opcode)
+
+
+def run(code, ip_reg, registers, ip=0):
+    """Interpret `code` one instruction at a time"""
+    registers = list(registers)
+    while 0 <= ip < len(code):
+        registers[ip_reg] = ip
+        apply(*code[ip], registers)
+        ip = registers[ip_reg] + 1
+    return registers
+
+
+# Expression templates; `a` and `b` are operands as they appear in the source
+# and `ra` and `rb` are the registers they name
+_expressions = {
+    'addr': '{ra} + {rb}',
+    'addi': '{ra} + {b}',
+    'mulr': '{ra} * {rb}',
+    'muli': '{ra} * {b}',
+    'banr': '{ra} & {rb}',
+    'bani': '{ra} & {b}',
+    'borr': '{ra} | {rb}',
+    'bori': '{ra} | {b}',
+    'setr': '{ra}',
+    'seti': '{a}',
+}
+
+_conditions = {
+    'gtir': '{a} > {rb}',
+    'gtri': '{ra} > {b}',
+    'gtrr': '{ra} > {rb}',
+    'eqir': '{a} == {rb}',
+    'eqri': '{ra} == {b}',
+    'eqrr': '{ra} == {rb}',
+}
+
+
+def register_operands(opcode, A, B):
+    """Return the registers read by an instruction"""
+    reads = []
+    if opcode[:2] in ('gt', 'eq'):
+        if opcode[2] == 'r':
+            reads.append(A)
+        if opcode[3] == 'r':
+            reads.append(B)
+    else:
+        if opcode != 'seti':
+            reads.append(A)
+        if opcode[3] == 'r' and opcode not in ('setr', 'seti'):
+            reads.append(B)
+    return reads
+
+
+def _canonical(code):
+    """Swap commutative operands so that `op x C C` is preferred over `op C x C`"""
+    canonical = []
+    for opcode, A, B, C in code:
+        if opcode in ('addr', 'mulr', 'banr', 'borr') and A == C != B:
+            A, B = B, A
+        canonical.append((opcode, A, B, C))
+    return canonical
+
+
+def _match_divide(code, k, P):
+    """Match the search for the smallest `q >= q0` with `(q + 1) * c > n`
+
+    addi q 1 t / muli t c t / gtrr t n t / addr t P P / addi P 1 P /
+    seti X _ P / addi q 1 q / seti k-1 _ P
+    """
+    match _canonical(code[k : k + 8]):
+        case [
+            ('addi', q, 1, t),
+            ('muli', t1, c, t2),
+            ('gtrr', t3, n, t4),
+            ('addr', t5, P1, P2),
+            ('addi', P3, 1, P4),
+            ('seti', exit_ip, _, P5),
+            ('addi', q1, 1, q2),
+            ('seti', back, _, P6),
+        ] if (
+            t == t1 == t2 == t3 == t4 == t5
+            and q == q1 == q2
+            and P == P1 == P2 == P3 == P4 == P5 == P6
+            and back == k - 1
+            and c > 0
+            and len({q, t, n, P}) == 4
+        ):
+            lines = [f'r{q} = max(r{q}, r{n} // {c})', f'r{t} = 1']
+            return lines, exit_ip + 1
+
+
+def _match_divisors(code, k, P):
+    """Match `do { if a * b == n: s += a; b += 1 } while b <= n`
+
+    mulr a b t / eqrr t n t / addr t P P / addi P 1 P / addr a s s /
+    addi b 1 b / gtrr b n t / addr P t P / seti k-1 _ P
+    """
+    match _canonical(code[k : k + 9]):
+        case [
+            ('mulr', a, b, t),
+            ('eqrr', t1, n, t2),
+            ('addr', t3, P1, P2),
+            ('addi', P3, 1, P4),
+            ('addr', a1, s, s1),
+            ('addi', b1, 1, b2),
+            ('gtrr', b3, n1, t4),
+            ('addr', t5, P5, P6),
+            ('seti', back, _, P7),
+        ] if (
+            t == t1 == t2 == t3 == t4 == t5
+            and a == a1
+            and s == s1
+            and b == b1 == b2 == b3
+            and n == n1
+            and P == P1 == P2 == P3 == P4 == P5 == P6 == P7
+            and back == k - 1
+            and len({a, b, t, n, s, P}) == 6
+        ):
+            lines = [
+                f'last = max(r{b}, r{n})',
+                f'if r{a} and r{n} % r{a} == 0 and r{b} <= r{n} // r{a} <= last:',
+                f'    r{s} += r{a}',
+                f'r{b} = last + 1',
+                f'r{t} = 1',
+            ]
+            return lines, k + 9
+
+
+IDIOMS = [_match_divide, _match_divisors]
+
+
+def _find_idioms(code, ip_reg):
+    idioms = {}
+    for k in range(len(code)):
+        for match_idiom in IDIOMS:
+            if (summary := match_idiom(code, k, ip_reg)) is not None:
+                idioms[k] = summary
+                break
+    return idioms
+
+
+def _block(code, P, start, breakpoints, idioms, loop_start, depth=3):
+    """Source for running from `start` until the ip register is written
+
+    Jumps to constant targets, and conditional jumps on a comparison made
+    earlier in the block, continue inline for up to `depth` jumps; a jump back
+    to `loop_start` restarts the enclosing loop. Anything else sets `ip` and
+    breaks out to the dispatcher.
+    """
+
+    def goto(target):
+        if target == loop_start:
+            return ['continue']
+        if depth == 0 or target in breakpoints or not 0 <= target < len(code):
+            return [f'ip = {target}', 'break']
+        return _block(code, P, target, breakpoints, idioms, loop_start, depth - 1)
+
+    lines = []
+    # register -> (condition it holds, registers the condition reads)
+    conditions = {}
+    j = start
+    while True:
+        if j in idioms:
+            summary, exit_ip = idioms[j]
+            return lines + summary + goto(exit_ip)
+        opcode, A, B, C = code[j]
+        reads = [x for x in register_operands(opcode, A, B) if x != P]
+
+        def reg(x):
+            return str(j) if x == P else f'r{x}'
+
+        if opcode in _conditions:
+            condition = _conditions[opcode].format(a=A, b=B, ra=reg(A), rb=reg(B))
+            expression = f'1 if {condition} else 0'
+        else:
+            expression = _expressions[opcode].format(a=A, b=B, ra=reg(A), rb=reg(B))
+
+        if C == P:
+            if not reads:
+                registers = [0] * 6
+                registers[P] = j
+                apply(opcode, A, B, C, registers)
+                return lines + goto(registers[P] + 1)
+            if opcode == 'addr' and P in (A, B) and reads[0] in conditions:
+                condition, _ = conditions[reads[0]]
+                return (
+                    lines
+                    + [f'if {condition}:']
+                    + ['    ' + x for x in goto(j + 2)]
+                    + ['else:']
+                    + ['    ' + x for x in goto(j + 1)]
+                )
+            return lines + [f'ip = ({expression}) + 1', 'break']
+
+        lines.append(f'r{C} = {expression}')
+        conditions = {
+            k: v for (k, v) in conditions.items() if k != C and C not in v[1]
+        }
+        if opcode in _conditions and C not in reads:
+            conditions[C] = (condition, reads)
+        j += 1
+        if j >= len(code) or j in breakpoints:
+            return lines + goto(j)
+
+
+def _dispatch(entries, low, high, indent):
+    """Binary search over ip for entry points in `range(low, high)`"""
+    pad = '    ' * indent
+    if high - low == 1:
+        return [pad + line for line in entries[low]]
+    middle = (low + high) // 2
+    return (
+        [pad + f'if ip < {middle}:']
+        + _dispatch(entries, low, middle, indent + 1)
+        + [pad + 'else:']
+        + _dispatch(entries, middle, high, indent + 1)
+    )
+
+
+def compile_program(code, ip_reg, breakpoints=()):
+    """Compile `code` into a generator function `run(registers, ip=0)`
+
+    The generator yields `(ip, registers)` just before executing any
+    instruction in `breakpoints` and returns the final registers when the
+    program halts.
+
+    >>> code = parse('#ip 0\\nseti 5 0 1\\nseti 6 0 2\\naddi 0 1 0\\n'
+    ...              'addr 1 2 3\\nsetr 1 0 0\\nseti 8 0 4\\nseti 9 0 5')
+    >>> ip_reg, code = split_ip(code)
+    >>> execute(code, ip_reg, [0] * 6)
+    [6, 5, 6, 0, 0, 9]
+    >>> run(code, ip_reg, [0] * 6)
+    [6, 5, 6, 0, 0, 9]
+    """
+    P = ip_reg
+    breakpoints = set(breakpoints)
+    idioms = _find_idioms(code, ip_reg)
+    entries = []
+    for i in range(len(code)):
+        # Each entry point loops on itself without going through the dispatcher
+        lines = []
+        if i in breakpoints:
+            lines += [f'r{P} = {i}', f'yield {i}, [r0, r1, r2, r3, r4, r5]']
+        lines += _block(code, P, i, breakpoints, idioms, loop_start=i)
+        entries.append(['while True:'] + ['    ' + x for x in lines])
+
+    source = '\n'.join(
+        [
+            'def run(registers, ip=0):',
+            '    r0, r1, r2, r3, r4, r5 = registers',
+            f'    while 0 <= ip < {len(code)}:',
+        ]
+        + _dispatch(entries, 0, len(code), 2)
+        + [
+            f'    r{P} = ip - 1',
+            '    return [r0, r1, r2, r3, r4, r5]',
+            '    yield  # Always a generator, even without breakpoints',
+        ]
+    )
+    namespace = {}
+    exec(compile(source, '<elfcode>', 'exec'), namespace)
+    return namespace['run']
+
+
+def execute(code, ip_reg, registers, ip=0):
+    """Compile and run `code` to completion, returning the final registers
+
+    >>> ops = ['gtir', 'gtri', 'eqir', 'eqri', 'bani', 'bori', 'banr', 'borr']
+    >>> programs = [[(op, 0, 2, 1), ('addi', 2, 1, 2), ('addi', 3, 1, 3)] for op in ops]
+    >>> all(execute(c, 1, [3, 0, 2, 0, 0, 0]) == run(c, 1, [3, 0, 2, 0, 0, 0])
+    ...     for c in programs)
+    True
+    """
+    runner = compile_program(code, ip_reg)(registers, ip)
+    try:
+        while True:
+            next(runner)
+    except StopIteration as stop:
+        return stop.value
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
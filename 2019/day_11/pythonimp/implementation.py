@@ -1,123 +1,9 @@
-from collections import defaultdict, deque
+import sys
+from collections import defaultdict
+from pathlib import Path
 
-
-def parse(text):
-    return [int(x) for x in text.strip().split(',')]
-
-
-def get_value(x, mode, program, relative_base):
-    match mode:
-        case 0:
-            assert x >= 0
-            return program.get(x, 0)
-        case 1:
-            return x
-        case 2:
-            assert x + relative_base >= 0
-            return program.get(x + relative_base, 0)
-        case _:
-            raise ValueError(mode)
-
-
-def set_value(x, v, mode, program, relative_base):
-    match mode:
-        case 0:
-            assert x >= 0
-            program[x] = v
-        case 2:
-            assert x + relative_base >= 0
-            program[x + relative_base] = v
-        case _:
-            raise ValueError(mode)
-
-
-def get_mode(x, i):
-    return (x // 10 ** (i - 1)) % 10
-
-
-class Computer:
-    def __init__(self, program):
-        self.relative_base = 0
-        self.pc = 0
-        self.program = {i: x for (i, x) in enumerate(program)}
-        self.is_running = True
-        self.inputs = deque()
-        self.outputs = deque()
-        self.run()
-
-    def _get(self, ndx, mode):
-        assert ndx >= 1
-        src = self.program[self.pc + ndx]
-        return get_value(src, get_mode(mode, ndx), self.program, self.relative_base)
-
-    def _set(self, ndx, value, mode):
-        assert ndx >= 1
-        dst = self.program[self.pc + ndx]
-        set_value(dst, value, get_mode(mode, ndx), self.program, self.relative_base)
-
-    def push_input(self, x):
-        self.inputs.appendleft(x)
-        self.run()
-
-    def pop_output(self):
-        return self.outputs.pop()
-
-    def run(self):
-        while self.is_running:
-            opcode = self.program[self.pc] % 100
-            mode = self.program[self.pc] // 100
-            match opcode:
-                case 1:  # add
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    self._set(3, a + b, mode)
-                    self.pc += 4
-                case 2:  # multiply
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    self._set(3, a * b, mode)
-                    self.pc += 4
-                case 3:  # input
-                    if not self.inputs:
-                        return  # Stop running till we get more inputs
-                    self._set(1, self.inputs.pop(), mode)
-                    self.pc += 2
-                case 4:  # output
-                    v = self._get(1, mode)
-                    self.outputs.appendleft(v)
-                    self.pc += 2
-                case 5:  # jump-if-true
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    if a:
-                        self.pc = b
-                    else:
-                        self.pc += 3
-                case 6:  # jump-if-false
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    if not a:
-                        self.pc = b
-                    else:
-                        self.pc += 3
-                case 7:  # less-than
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    self._set(3, int(a < b), mode)
-                    self.pc += 4
-                case 8:  # equal-to
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    self._set(3, int(a == b), mode)
-                    self.pc += 4
-                case 9:  # adjust relative base
-                    a = self._get(1, mode)
-                    self.relative_base += a
-                    self.pc += 2
-                case 99:  # exit
-                    self.is_running = False
-                case _:
-                    raise ValueError(f'unknown opcode: {opcode}')
+sys.path.insert(0, str(Path(__file__).parents[2]))
+from intcode import Computer, parse  # noqa: E402
 
 
 def paint(hull, computer):
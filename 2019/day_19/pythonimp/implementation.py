@@ -1,249 +1,108 @@
-from collections import defaultdict, deque
-from copy import deepcopy
-from heapq import heapify, heappop, heappush
+import sys
+from functools import cache
+from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parents[2]))
+from intcode import Computer, parse  # noqa: E402
 
-def parse(text):
-    return [int(x) for x in text.strip().split(',')]
 
+def build_probe(computer):
+    """Return a memoized `is_pulled_on(i, j)` for the drone program in `computer`
 
-def get_value(x, mode, program, relative_base):
-    match mode:
-        case 0:
-            assert x >= 0
-            return program.get(x, 0)
-        case 1:
-            return x
-        case 2:
-            assert x + relative_base >= 0
-            return program.get(x + relative_base, 0)
-        case _:
-            raise ValueError(mode)
-
-
-def set_value(x, v, mode, program, relative_base):
-    match mode:
-        case 0:
-            assert x >= 0
-            program[x] = v
-        case 2:
-            assert x + relative_base >= 0
-            program[x + relative_base] = v
-        case _:
-            raise ValueError(mode)
-
-
-def get_mode(x, i):
-    return (x // 10 ** (i - 1)) % 10
-
-
-class Computer:
-    def __init__(self, program):
-        self.relative_base = 0
-        self.pc = 0
-        self.program = {i: x for (i, x) in enumerate(program)}
-        self.is_running = True
-        self.inputs = deque()
-        self.outputs = deque()
-        self.run()
-
-    def copy(self):
-        return deepcopy(self)
-
-    def __lt__(self, other):
-        return False
-
-    def _get(self, ndx, mode):
-        assert ndx >= 1
-        src = self.program[self.pc + ndx]
-        return get_value(src, get_mode(mode, ndx), self.program, self.relative_base)
-
-    def _set(self, ndx, value, mode):
-        assert ndx >= 1
-        dst = self.program[self.pc + ndx]
-        set_value(dst, value, get_mode(mode, ndx), self.program, self.relative_base)
-
-    def push_input(self, x):
-        self.inputs.appendleft(x)
-        self.run()
+    The drone program is a pure function of the coordinates it is given, so
+    each point only ever needs to be run once.
+    """
 
-    def push_all_inputs(self, sequence):
-        for x in sequence:
-            self.inputs.appendleft(x)
-        self.run()
+    @cache
+    def is_pulled_on(i, j):
+        if i < 0 or j < 0:
+            return False
+        clone = computer.copy()
+        clone.push_sequence([j, i])
+        return bool(clone.pop_output())
 
-    def pop_output(self):
-        return self.outputs.pop()
+    return is_pulled_on
 
-    def pop_all_outputs(self):
-        while self.outputs:
-            yield self.outputs.pop()
 
-    def run(self):
-        while self.is_running:
-            opcode = self.program[self.pc] % 100
-            mode = self.program[self.pc] // 100
-            match opcode:
-                case 1:  # add
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    self._set(3, a + b, mode)
-                    self.pc += 4
-                case 2:  # multiply
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    self._set(3, a * b, mode)
-                    self.pc += 4
-                case 3:  # input
-                    if not self.inputs:
-                        return  # Stop running till we get more inputs
-                    self._set(1, self.inputs.pop(), mode)
-                    self.pc += 2
-                case 4:  # output
-                    v = self._get(1, mode)
-                    self.outputs.appendleft(v)
-                    self.pc += 2
-                case 5:  # jump-if-true
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    if a:
-                        self.pc = b
-                    else:
-                        self.pc += 3
-                case 6:  # jump-if-false
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    if not a:
-                        self.pc = b
-                    else:
-                        self.pc += 3
-                case 7:  # less-than
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    self._set(3, int(a < b), mode)
-                    self.pc += 4
-                case 8:  # equal-to
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    self._set(3, int(a == b), mode)
-                    self.pc += 4
-                case 9:  # adjust relative base
-                    a = self._get(1, mode)
-                    self.relative_base += a
-                    self.pc += 2
-                case 99:  # exit
-                    self.is_running = False
-                case _:
-                    raise ValueError(f'unknown opcode: {opcode}')
+def scan_beam(is_pulled_on):
+    """Yield `(i, low, high)` for each row, where `high < low` if the row is empty
 
+    Only the two edges of the beam are tracked. Both edges move right
+    monotonically, so the number of probes grows linearly with the row count.
 
-def is_pulled_on(i, j, computer):
-    if i < 0 or j < 0:
-        return False
-    clone = computer.copy()
-    clone.push_all_inputs([j, i])
-    return bool(clone.pop_output())
+    >>> beam = lambda i, j: 7 * i <= 10 * j <= 9 * i
+    >>> [x for (_, x) in zip(range(6), scan_beam(beam))]
+    [(0, 0, 0), (1, 0, -1), (2, 0, -1), (3, 0, -1), (4, 3, 3), (5, 4, 4)]
+    """
+    low = high = None
+    i = 0
+    while True:
+        if low is None:
+            # Near the emitter rows can be empty, so search them exhaustively
+            for j in range(10 * (i + 1)):
+                if is_pulled_on(i, j):
+                    low = high = j
+                    break
+            else:
+                yield i, 0, -1
+                i += 1
+                continue
+        else:
+            for low in range(low, high + 2):
+                if is_pulled_on(i, low):
+                    break
+            else:
+                # Lost the beam; fall back to searching from scratch
+                low = high = None
+                continue
+            high = max(high, low)
+        while is_pulled_on(i, high + 1):
+            high += 1
+        yield i, low, high
+        i += 1
 
 
-def part_1(text):
+def part_1(text, size=50):
     """
     >>> part_1(EXAMPLE_TEXT)
     223
     """
-    computer = Computer(parse(text))
-    in_tractor_beam = set()
-    seen = set()
-    queue = [(i, j) for i in range(5) for j in range(5)]
-    heapify(queue)
-    while queue:
-        i, j = heappop(queue)
-        if (i, j) in seen or i >= 50 or j >= 50:
-            continue
-        seen.add((i, j))
-        if is_pulled_on(i, j, computer):
-            in_tractor_beam.add((i, j))
-            for di in (-1, 0, 1):
-                for dj in (-1, 0, 1):
-                    heappush(queue, (i + di, j + dj))
-    return len(in_tractor_beam)
-
-
-def can_fit_square(region, size):
-    n_i = len(region)
-    for i in range(n_i - size):
-        row = region[i]
-        if len(row) < size:
-            continue
-        cumlow = row[0]
-        cumhigh = row[-1]
-        if len(row) != cumhigh - cumlow + 1:
-            continue
-
-        for i1 in range(i + 1, i + size):
-            row = region[i1]
-            low = row[0]
-            high = row[-1]
-            if len(row) != high - low + 1:
-                break
-            cumhigh = min(high, cumhigh)
-            cumlow = max(low, cumlow)
-            if cumhigh - cumlow + 1 < size:
-                break
-        else:
-            return i, cumlow
+    is_pulled_on = build_probe(Computer(parse(text)))
+    count = 0
+    for i, low, high in scan_beam(is_pulled_on):
+        if i >= size:
+            break
+        count += max(0, min(high, size - 1) - low + 1)
+    return count
 
 
-def render(in_tractor_beam):
-    i0 = j0 = 1
-    i1 = len(in_tractor_beam) - 1
-    j1 = max(x[-1] if x else 0 for x in in_tractor_beam)
+def find_square(is_pulled_on, size):
+    """Return the `(i, j)` of the top left corner of the closest square that fits
 
-    scan_lines = []
-    for i in range(i0, i1 + 1):
-        chars = []
-        for j in range(j0, j1 + 1):
-            if j in in_tractor_beam[i]:
-                chars.append('#')
-            else:
-                chars.append('.')
-        scan_lines.append(''.join(chars))
-    return '\n'.join(scan_lines)
+    >>> beam = lambda i, j: 7 * i <= 10 * j <= 9 * i
+    >>> find_square(beam, 3)
+    (18, 14)
+    """
+    highs = {}
+    for i, low, high in scan_beam(is_pulled_on):
+        highs[i] = high
+        top = i - size + 1
+        if high - low + 1 >= size and highs.get(top, -1) >= low + size - 1:
+            return top, low
 
 
-# TODO
-def part_2(text):
+def part_2(text, size=100):
     """
-    >>> part_2(EXAMPLE_TEXT)
-    223
+    A drone program for the beam `7 * i <= 10 * j <= 9 * i`:
+
+    >>> beam = ('3,100,3,101,1002,100,10,102,1002,101,7,103,1002,101,9,104,'
+    ...         '7,102,103,105,7,104,102,106,1,105,106,107,1008,107,0,108,4,108,99')
+    >>> part_2(beam, size=3)
+    140018
     """
-    computer = Computer(parse(text))
-    in_tractor_beam = [[]]
-    seen = set()
-    queue = [(i, j) for i in range(5) for j in range(5)]
-    heapify(queue)
-    last_i = -1
-    while queue:
-        i, j = heappop(queue)
-        if (i, j) in seen:
-            continue
-        seen.add((i, j))
-        if is_pulled_on(i, j, computer):
-            if last_i != i:
-                if i % 100 == 0:
-                    print('.')
-                    size = 100
-                    if location := can_fit_square(in_tractor_beam, size):
-                        y, x = location
-                        # print(render(in_tractor_beam, y, x, size))
-                        return x * 10000 + y
-                last_i = i
-            while len(in_tractor_beam) <= i:
-                in_tractor_beam.append([])
-            heappush(in_tractor_beam[i], j)
-            for di in (-1, 0, 1):
-                for dj in (-1, 0, 1):
-                    heappush(queue, (i + di, j + dj))
-    return sum(len(x) for x in in_tractor_beam.values())
+    is_pulled_on = build_probe(Computer(parse(text)))
+    i, j = find_square(is_pulled_on, size)
+    return j * 10000 + i
 
 
 if __name__ == "__main__":
@@ -1,215 +1,102 @@
-from collections import defaultdict, deque
-from copy import deepcopy
-
-
-def parse(text):
-    return [int(x) for x in text.strip().split(',')]
-
-
-def get_value(x, mode, program, relative_base):
-    match mode:
-        case 0:
-            assert x >= 0
-            return program.get(x, 0)
-        case 1:
-            return x
-        case 2:
-            assert x + relative_base >= 0
-            return program.get(x + relative_base, 0)
-        case _:
-            raise ValueError(mode)
-
-
-def set_value(x, v, mode, program, relative_base):
-    match mode:
-        case 0:
-            assert x >= 0
-            program[x] = v
-        case 2:
-            assert x + relative_base >= 0
-            program[x + relative_base] = v
-        case _:
-            raise ValueError(mode)
-
-
-def get_mode(x, i):
-    return (x // 10 ** (i - 1)) % 10
-
-
-class Computer:
-    def __init__(self, program):
-        self.relative_base = 0
-        self.pc = 0
-        self.program = {i: x for (i, x) in enumerate(program)}
-        self.is_running = True
-        self.inputs = deque()
-        self.outputs = deque()
-        self.run()
-
-    def copy(self):
-        return deepcopy(self)
-
-    def __lt__(self, other):
-        return False
-
-    def _get(self, ndx, mode):
-        assert ndx >= 1
-        src = self.program[self.pc + ndx]
-        return get_value(src, get_mode(mode, ndx), self.program, self.relative_base)
-
-    def _set(self, ndx, value, mode):
-        assert ndx >= 1
-        dst = self.program[self.pc + ndx]
-        set_value(dst, value, get_mode(mode, ndx), self.program, self.relative_base)
-
-    def push_input(self, x):
-        self.inputs.appendleft(x)
-        self.run()
-
-    def push_sequence(self, sequence):
-        for x in sequence:
-            self.inputs.appendleft(x)
-        self.run()
-
-    def push_string(self, string):
-        self.push_sequence((ord(x) for x in string))
-
-    def pop_output(self):
-        return self.outputs.pop()
-
-    def pop_sequence(self):
-        while self.outputs:
-            yield self.outputs.pop()
-
-    def pop_line(self):
-        chars = []
-        while True:
-            chars.append((x := self.outputs.pop()))
-            if x == 10:
-                break
-        return ''.join(chr(x) for x in chars)
-
-    def pop_string(self):
-        return ''.join(chr(x) for x in self.pop_sequence())
-
-    def run(self):
-        while self.is_running:
-            opcode = self.program[self.pc] % 100
-            mode = self.program[self.pc] // 100
-            match opcode:
-                case 1:  # add
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    self._set(3, a + b, mode)
-                    self.pc += 4
-                case 2:  # multiply
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    self._set(3, a * b, mode)
-                    self.pc += 4
-                case 3:  # input
-                    if not self.inputs:
-                        return  # Stop running till we get more inputs
-                    self._set(1, self.inputs.pop(), mode)
-                    self.pc += 2
-                case 4:  # output
-                    v = self._get(1, mode)
-                    self.outputs.appendleft(v)
-                    self.pc += 2
-                case 5:  # jump-if-true
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    if a:
-                        self.pc = b
-                    else:
-                        self.pc += 3
-                case 6:  # jump-if-false
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    if not a:
-                        self.pc = b
-                    else:
-                        self.pc += 3
-                case 7:  # less-than
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    self._set(3, int(a < b), mode)
-                    self.pc += 4
-                case 8:  # equal-to
-                    a = self._get(1, mode)
-                    b = self._get(2, mode)
-                    self._set(3, int(a == b), mode)
-                    self.pc += 4
-                case 9:  # adjust relative base
-                    a = self._get(1, mode)
-                    self.relative_base += a
-                    self.pc += 2
-                case 99:  # exit
-                    self.is_running = False
-                case _:
-                    raise ValueError(f'unknown opcode: {opcode}')
-
-
-def part_1(text):
+import sys
+from collections import deque
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).parents[2]))
+from intcode import Computer, parse  # noqa: E402
+
+NAT = 255
+
+
+class Network:
+    """Event driven simulation of the category six network
+
+    Only computers with unread packets are scheduled. Each one runs until it
+    blocks on input, and then sees a single -1 before going back to sleep, so
+    the network is idle exactly when the ready queue is empty.
+    """
+
+    def __init__(self, program, n_nodes=50):
+        self.computers = []
+        self.ready = deque()
+        self.is_ready = [False] * n_nodes
+        self.nat_packet = None
+        self.first_nat_packet = None
+        self.packets_routed = 0
+        self.t0 = perf_counter()
+        for address in range(n_nodes):
+            computer = Computer(program)
+            computer.push_input(address)
+            self.computers.append(computer)
+            self._schedule(address)
+
+    def _schedule(self, address):
+        if not self.is_ready[address]:
+            self.is_ready[address] = True
+            self.ready.append(address)
+
+    def send(self, address, x, y):
+        self.packets_routed += 1
+        if address == NAT:
+            self.nat_packet = (x, y)
+            if self.first_nat_packet is None:
+                self.first_nat_packet = (x, y)
+            return
+        inputs = self.computers[address].inputs
+        inputs.appendleft(x)
+        inputs.appendleft(y)
+        self._schedule(address)
+
+    def step(self):
+        """Run the next ready computer until it blocks and route what it sent"""
+        address = self.ready.popleft()
+        self.is_ready[address] = False
+        computer = self.computers[address]
+        computer.run()
+        computer.push_input(-1)
+        outputs = computer.outputs
+        while len(outputs) >= 3:
+            self.send(outputs.pop(), outputs.pop(), outputs.pop())
+
+    def run_until_idle(self):
+        while self.ready:
+            self.step()
+
+    def packet_rate(self):
+        return self.packets_routed / (perf_counter() - self.t0)
+
+
+def part_1(text, n_nodes=50, report=False):
     """
     >>> part_1(INPUT_TEXT)
     23057
     """
-    program = parse(text)
-    computers = []
-    for i in range(50):
-        c = Computer(program)
-        c.push_input(i)
-        computers.append(c)
+    network = Network(parse(text), n_nodes)
+    while network.first_nat_packet is None:
+        network.step()
+    if report:
+        print(f"{network.packet_rate():.0f} packets routed per second")
+    X, Y = network.first_nat_packet
+    return Y
 
-    while True:
-        for c in computers:
-            c.push_input(-1)
-            if c.outputs:
-                sequence = list(c.pop_sequence())
-                for i in range(0, len(sequence), 3):
-                    A, X, Y = sequence[i : i + 3]
-                    if A == 255:
-                        return Y
-                    computers[A].push_sequence([X, Y])
-
-
-def part_2(text):
+
+def part_2(text, n_nodes=50, report=False):
     """
     >>> part_2(INPUT_TEXT)
     15156
     """
-    program = parse(text)
-    computers = []
-    for i in range(50):
-        c = Computer(program)
-        c.push_input(i)
-        computers.append(c)
-
-    last_packet = None
+    network = Network(parse(text), n_nodes)
     last_y = None
     while True:
-        is_idle = True
-        for c in computers:
-            if c.inputs:
-                is_idle = False
-            c.push_input(-1)
-            if c.outputs:
-                sequence = list(c.pop_sequence())
-                if len(sequence):
-                    is_idle = False
-                for i in range(0, len(sequence), 3):
-                    A, X, Y = sequence[i : i + 3]
-                    if A == 255:
-                        last_packet = (X, Y)
-                    else:
-                        computers[A].push_sequence([X, Y])
-        if is_idle:
-            X, Y = last_packet
-            if Y == last_y:
-                return Y
-            computers[0].push_sequence(last_packet)
-            last_y = Y
+        network.run_until_idle()
+        X, Y = network.nat_packet
+        if Y == last_y:
+            if report:
+                print(f"{network.packet_rate():.0f} packets routed per second")
+            return Y
+        network.send(0, X, Y)
+        last_y = Y
 
 
 if __name__ == "__main__":
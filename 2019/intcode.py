@@ -0,0 +1,272 @@
+"""Shared Intcode computer used by the 2019 puzzles.
+
+Days import this with::
+
+    sys.path.insert(0, str(Path(__file__).parents[2]))
+    from intcode import Computer, parse
+
+Memory is split into fixed size pages that are allocated on demand and shared
+copy-on-write between a computer and its copies, so `Computer.copy` only costs
+a page table copy up front plus one page copy for each page either side later
+writes to. Instructions are decoded once per distinct instruction word, so
+self-modifying programs stay correct.
+"""
+from collections import deque
+
+
+def parse(text):
+    """
+    >>> parse('109,1,204,-1,99')
+    [109, 1, 204, -1, 99]
+    """
+    return [int(x) for x in text.strip().split(',')]
+
+
+PAGE_BITS = 6
+PAGE_SIZE = 1 << PAGE_BITS
+PAGE_MASK = PAGE_SIZE - 1
+
+# Number of parameters for each opcode
+N_PARAMS = {1: 3, 2: 3, 3: 1, 4: 1, 5: 2, 6: 2, 7: 3, 8: 3, 9: 1, 99: 0}
+
+_decoded = {}
+
+
+def decode(word):
+    """Split an instruction word into `(opcode, mode_1, mode_2, mode_3)`
+
+    >>> decode(1002)
+    (2, 0, 1, 0)
+    >>> decode(21107)
+    (7, 1, 1, 2)
+    """
+    if (instruction := _decoded.get(word)) is None:
+        opcode = word % 100
+        if opcode not in N_PARAMS:
+            raise ValueError(f'unknown opcode: {opcode}')
+        instruction = (opcode, word // 100 % 10, word // 1000 % 10, word // 10000 % 10)
+        if any(m not in (0, 1, 2) for m in instruction[1:]):
+            raise ValueError(f'unknown mode in instruction: {word}')
+        _decoded[word] = instruction
+    return instruction
+
+
+class Computer:
+    """
+    >>> quine = parse('109,1,204,-1,1001,100,1,100,1008,100,16,101,1006,101,0,99')
+    >>> list(Computer(quine).pop_sequence()) == quine
+    True
+    >>> Computer([1102, 34915192, 34915192, 7, 4, 7, 99, 0]).pop_output()
+    1219070632396864
+    >>> c = Computer([3, 9, 8, 9, 10, 9, 4, 9, 99, -1, 8])
+    >>> c.push_input(8)
+    >>> c.pop_output(), c.is_running
+    (1, False)
+    """
+
+    def __init__(self, program):
+        self.relative_base = 0
+        self.pc = 0
+        self._owner = owner = object()
+        program = list(program)
+        program.extend([0] * (-len(program) % PAGE_SIZE))
+        self.pages = [
+            program[i : i + PAGE_SIZE] for i in range(0, len(program), PAGE_SIZE)
+        ]
+        # Pages are only written in place by the computer that owns them
+        self.owners = [owner] * len(self.pages)
+        self.is_running = True
+        self.inputs = deque()
+        self.outputs = deque()
+        self.run()
+
+    def copy(self):
+        """Fork this computer, sharing memory pages until they are written
+
+        >>> parent = Computer([3, 20, 4, 20, 1105, 1, 0])
+        >>> parent.push_input(1)
+        >>> child = parent.copy()
+        >>> child.push_input(2)
+        >>> parent.push_input(3)
+        >>> list(parent.pop_sequence()), list(child.pop_sequence())
+        ([1, 3], [1, 2])
+        """
+        clone = object.__new__(type(self))
+        clone.relative_base = self.relative_base
+        clone.pc = self.pc
+        # Neither side owns the shared pages any more, so the first write to
+        # a page from either side copies it.
+        self._owner = object()
+        clone._owner = object()
+        clone.pages = self.pages.copy()
+        clone.owners = self.owners.copy()
+        clone.is_running = self.is_running
+        clone.inputs = self.inputs.copy()
+        clone.outputs = self.outputs.copy()
+        return clone
+
+    def __getitem__(self, address):
+        assert address >= 0
+        page = address >> PAGE_BITS
+        if page >= len(self.pages):
+            return 0
+        return self.pages[page][address & PAGE_MASK]
+
+    def __lt__(self, other):
+        return False
+
+    def push_input(self, x):
+        self.inputs.appendleft(x)
+        self.run()
+
+    def push_sequence(self, sequence):
+        for x in sequence:
+            self.inputs.appendleft(x)
+        self.run()
+
+    def push_string(self, string):
+        self.push_sequence(ord(x) for x in string)
+
+    def pop_output(self):
+        return self.outputs.pop()
+
+    def pop_sequence(self):
+        while self.outputs:
+            yield self.outputs.pop()
+
+    def pop_line(self):
+        chars = []
+        while True:
+            chars.append((x := self.outputs.pop()))
+            if x == 10:
+                break
+        return ''.join(chr(x) for x in chars)
+
+    def pop_string(self):
+        return ''.join(chr(x) for x in self.pop_sequence())
+
+    def _writable_page(self, page):
+        """Return page `page` for writing, allocating or unsharing it as needed"""
+        assert page >= 0
+        pages = self.pages
+        owner = self._owner
+        if page >= len(pages):
+            for _ in range(len(pages), page + 1):
+                pages.append([0] * PAGE_SIZE)
+                self.owners.append(owner)
+        elif self.owners[page] is not owner:
+            pages[page] = pages[page].copy()
+            self.owners[page] = owner
+        return pages[page]
+
+    def run(self):
+        if not self.is_running:
+            return
+        pages = self.pages
+        owners = self.owners
+        owner = self._owner
+        writable_page = self._writable_page
+        pc = self.pc
+        relative_base = self.relative_base
+        inputs = self.inputs
+        outputs = self.outputs
+        decoded = _decoded
+
+        def read(address):
+            page = address >> PAGE_BITS
+            return pages[page][address & PAGE_MASK] if page < len(pages) else 0
+
+        while True:
+            page = pages[pc >> PAGE_BITS]
+            offset = pc & PAGE_MASK
+            if offset > PAGE_SIZE - 4:
+                # The instruction may straddle a page boundary
+                words = [read(pc + i) for i in range(4)]
+            else:
+                words = page[offset : offset + 4]
+            if (instruction := decoded.get(words[0])) is None:
+                instruction = decode(words[0])
+            opcode, mode_1, mode_2, mode_3 = instruction
+
+            if opcode == 99:
+                self.is_running = False
+                break
+
+            # Resolve parameter addresses; immediate parameters address themselves
+            a = pc + 1
+            if mode_1 == 0:
+                a = words[1]
+                assert a >= 0
+            elif mode_1 == 2:
+                a = relative_base + words[1]
+                assert a >= 0
+            if opcode == 3:  # input
+                if not inputs:
+                    break  # Stop running till we get more inputs
+                page = a >> PAGE_BITS
+                if page < len(pages) and owners[page] is owner:
+                    pages[page][a & PAGE_MASK] = inputs.pop()
+                else:
+                    writable_page(page)[a & PAGE_MASK] = inputs.pop()
+                pc += 2
+                continue
+            if mode_1 == 1:
+                x = words[1]
+            else:
+                page = a >> PAGE_BITS
+                x = pages[page][a & PAGE_MASK] if page < len(pages) else 0
+            if opcode == 4:  # output
+                outputs.appendleft(x)
+                pc += 2
+                continue
+            if opcode == 9:  # adjust relative base
+                relative_base += x
+                pc += 2
+                continue
+
+            if mode_2 == 1:
+                y = words[2]
+            else:
+                b = words[2] if mode_2 == 0 else relative_base + words[2]
+                assert b >= 0
+                page = b >> PAGE_BITS
+                y = pages[page][b & PAGE_MASK] if page < len(pages) else 0
+            if opcode == 5:  # jump-if-true
+                pc = y if x else pc + 3
+                assert pc >= 0
+                continue
+            if opcode == 6:  # jump-if-false
+                pc = pc + 3 if x else y
+                assert pc >= 0
+                continue
+
+            if mode_3 == 0:
+                c = words[3]
+            elif mode_3 == 2:
+                c = relative_base + words[3]
+            else:
+                raise ValueError(f'immediate mode write at {pc}')
+            assert c >= 0
+            if opcode == 1:  # add
+                x = x + y
+            elif opcode == 2:  # multiply
+                x = x * y
+            elif opcode == 7:  # less-than
+                x = int(x < y)
+            else:  # equal-to
+                x = int(x == y)
+            page = c >> PAGE_BITS
+            if page < len(pages) and owners[page] is owner:
+                pages[page][c & PAGE_MASK] = x
+            else:
+                writable_page(page)[c & PAGE_MASK] = x
+            pc += 4
+
+        self.pc = pc
+        self.relative_base = relative_base
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
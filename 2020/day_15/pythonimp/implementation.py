@@ -1,5 +1,4 @@
-from collections import defaultdict
-from itertools import count
+from array import array
 
 
 def parse(text):
@@ -10,6 +9,35 @@ def parse(text):
     return [int(x) for x in text.strip().split(",")]
 
 
+def play(start, n, chunk_size=1_000_000):
+    """Yield `(turn, number)` every `chunk_size` turns, ending at turn `n`
+
+    The turn each number was last spoken is kept in a preallocated array
+    indexed by the number, at 4 bytes per possible number. Numbers spoken
+    are ages, which are always less than the turn, so the array never has
+    to grow past `n`.
+
+    >>> list(play([0, 3, 6], 10, chunk_size=4))
+    [(4, 0), (8, 0), (10, 0)]
+    >>> list(play([0, 3, 6], 9, chunk_size=4))
+    [(4, 0), (8, 0), (9, 4)]
+    """
+    # last[x] is the turn x was last spoken before the current one, or 0
+    last = array("I", [0]) * max(n, max(start) + 1)
+    for turn, x in enumerate(start[:-1], 1):
+        last[x] = turn
+    x = start[-1]
+    turn = len(start)
+    while turn < n:
+        stop = min(turn + chunk_size - turn % chunk_size, n)
+        for turn in range(turn, stop):
+            previous = last[x]
+            last[x] = turn
+            x = turn - previous if previous else 0
+        turn = stop
+        yield turn, x
+
+
 def part_1(text, n=2020):
     """
     >>> part_1(EXAMPLE_TEXT)
@@ -17,15 +45,10 @@ def part_1(text, n=2020):
     >>> part_1("3,2,1")
     438
     """
-    last = {}
     start = parse(text)
-    for i, x in enumerate(start):
-        next_x = i - last.get(x, i)
-        last[x] = i
-    for i in range(len(start), n):
-        x = next_x
-        next_x = i - last.get(x, i)
-        last[x] = i
+    if n <= len(start):
+        return start[n - 1]
+    *_, (_, x) = play(start, n)
     return x
 
 
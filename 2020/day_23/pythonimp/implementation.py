@@ -1,4 +1,4 @@
-from collections import deque
+from array import array
 
 
 def parse(text):
@@ -9,105 +9,67 @@ def parse(text):
     return [int(x) for x in text.strip()]
 
 
-def apply_step(cups, max_label):
-    """
-    >>> cups = deque(parse(EXAMPLE_TEXT)); cups
-    deque([3, 8, 9, 1, 2, 5, 4, 6, 7])
-    >>> apply_step(cups, 9); cups
-    deque([2, 8, 9, 1, 5, 4, 6, 7, 3])
-    >>> apply_step(cups, 9); cups
-    deque([5, 4, 6, 7, 8, 9, 1, 3, 2])
-    """
-    destination_label = cups[0] - 1
-    if destination_label < 1:
-        destination_label = max_label
-    # Place the cups we want to remove at locations 0, 1, 2
-    cups.rotate(-1)
-    # Remove the first three cups
-    removed = [cups.popleft() for _ in range(3)]
-
-    while destination_label in removed:
-        destination_label -= 1
-        if destination_label < 1:
-            destination_label = max_label
-
-    # This is expensive <===
-    cups.rotate(20000)
-    destination_index = cups.index(destination_label, 0, 40000)
-    cups.rotate(-20000)
-    destination_index = (destination_index - 20000) % len(cups)
-
-    # So is rotate if k is large
-    # Insert removed at label
-    cups.rotate(-(destination_index + 1))
-    cups.extendleft(removed[::-1])
-    cups.rotate(destination_index + 1)
-
-
-def play_game_naive(cups, iterations):
-    max_label = max(cups)
-    cups = deque(cups)
-    for _ in range(iterations):
-        apply_step(cups, max_label=max_label)
-    i = cups.index(1)
-    return cups, i
-
-
-def offset_mod(x, n):
-    while x < 1:
-        x += n
-    while x > n:
-        x -= n
-    return x
-
-
-def apply_step_ll(cups, origin, max_cup):
-    target_label = offset_mod(origin - 1, max_cup)
-
-    removed = []
-    label = origin
-    for _ in range(3):
-        label = cups[label]
-        removed.append(label)
-    next_label = cups[label]
-
-    while target_label in removed:
-        target_label = offset_mod(target_label - 1, max_cup)
-
-    # Cut out removed cups
-    cups[origin] = next_label
-
-    # Insert removed cups after target_label
-    next_label = cups[target_label]
-    last_label = target_label
-    for label in removed:
-        cups[last_label] = label
-        last_label = label
-    cups[last_label] = next_label
-    cups[next_label] = cups[next_label]
-
-    return cups, cups[origin]
-
-
-def play_game_ll(cups, iterations):
-    """
-    >>> cups = deque(parse(EXAMPLE_TEXT)); cups
-    deque([3, 8, 9, 1, 2, 5, 4, 6, 7])
-    >>> cups, origin = play_game_ll(cups, 1)
-    >>> origin
-    2
-    """
-    raw_cups = cups
-    n = len(cups)
-    cups = [None] * (n + 1)
-    for i, k in enumerate(raw_cups):
-        cups[k] = raw_cups[(i + 1) % n]
+class Cups:
+    """Cups labelled 1 to n in a circle
+
+    The circle is a linked list held in an array, where `next[label]` is the
+    label of the cup clockwise of cup `label`, so a move only relinks three
+    cups and 4 bytes are needed per cup.
 
-    origin = raw_cups[0]
-    for _ in range(iterations):
-        cups, origin = apply_step_ll(cups, origin, n)
+    >>> cups = Cups(parse(EXAMPLE_TEXT))
+    >>> cups.step(); cups.labels(cups.current)
+    [2, 8, 9, 1, 5, 4, 6, 7, 3]
+    >>> cups.step(); cups.labels(cups.current)
+    [5, 4, 6, 7, 8, 9, 1, 3, 2]
+    >>> snapshot = cups.copy()
+    >>> cups.step(8); cups.labels(1)
+    [1, 9, 2, 6, 5, 8, 3, 7, 4]
+    >>> snapshot.labels(1)
+    [1, 3, 2, 5, 4, 6, 7, 8, 9]
+    """
 
-    return cups, origin
+    def __init__(self, labels):
+        self.max_label = len(labels)
+        assert sorted(labels) == list(range(1, self.max_label + 1))
+        self.next = array("I", [0]) * (self.max_label + 1)
+        for label, next_label in zip(labels, labels[1:] + labels[:1]):
+            self.next[label] = next_label
+        self.current = labels[0]
+
+    def copy(self):
+        clone = object.__new__(type(self))
+        clone.max_label = self.max_label
+        clone.next = self.next[:]
+        clone.current = self.current
+        return clone
+
+    def step(self, moves=1):
+        """Make `moves` moves"""
+        next_ = self.next
+        current = self.current
+        max_label = self.max_label
+        for _ in range(moves):
+            a = next_[current]
+            b = next_[a]
+            c = next_[b]
+            destination = current - 1 or max_label
+            while destination == a or destination == b or destination == c:
+                destination = destination - 1 or max_label
+            # Cut out a, b, c and put them back after the destination
+            next_[current] = next_[c]
+            next_[c] = next_[destination]
+            next_[destination] = a
+            current = next_[current]
+        self.current = current
+
+    def labels(self, start, count=None):
+        """Labels clockwise from cup `start`, for `count` cups or all of them"""
+        labels = []
+        label = start
+        for _ in range(self.max_label if count is None else count):
+            labels.append(label)
+            label = self.next[label]
+        return labels
 
 
 def part_1(text):
@@ -115,15 +77,9 @@ def part_1(text):
     >>> part_1(EXAMPLE_TEXT)
     '67384529'
     """
-    cups, origin = play_game_ll(parse(text), iterations=100)
-    values = []
-    n = cups[1]
-    for _ in range(9):
-        values.append(n)
-        n = cups[n]
-    values = deque(values)
-    values.rotate(-values.index(1))
-    return ''.join(str(x) for x in list(values)[1:])
+    cups = Cups(parse(text))
+    cups.step(100)
+    return ''.join(str(x) for x in cups.labels(1)[1:])
 
 
 def part_2(text, iterations=10000000):
@@ -133,9 +89,9 @@ def part_2(text, iterations=10000000):
     """
     initial_cups = parse(text)
     initial_cups.extend(range(max(initial_cups) + 1, 1000000 + 1))
-    cups, origin = play_game_ll(initial_cups, iterations=iterations)
-    a = cups[1]
-    b = cups[a]
+    cups = Cups(initial_cups)
+    cups.step(iterations)
+    _, a, b = cups.labels(1, 3)
     return a * b
 
 
@@ -7,6 +7,9 @@
 2713310158
 """
 
+from collections import Counter
+from math import lcm
+
 
 def extract_from(line, prefix, factory, suffix=""):
     line = line.strip()
@@ -68,23 +71,26 @@ class Monkey:
         self.relief_factor = relief_factor
         self.inspections = 0
 
+    def inspect(self, x, modulus):
+        """Return the new worry level for an item and who it gets thrown to"""
+        x = (self.operation(x) // self.relief_factor) % modulus
+        if x % self.test_value == 0:
+            return x, self.true_target
+        return x, self.false_target
+
     def take_turn(self, modulus):
         targets = {self.true_target: [], self.false_target: []}
         for x in self.items:
             self.inspections += 1
-            x = (self.operation(x) // self.relief_factor) % modulus
-            if x % self.test_value == 0:
-                targets[self.true_target].append(x)
-            else:
-                targets[self.false_target].append(x)
+            x, target = self.inspect(x, modulus)
+            targets[target].append(x)
         self.items = []
         return targets
 
     @staticmethod
-    def play_round(monkeys):
-        modulus = 1
-        for m in monkeys.values():
-            modulus *= m.test_value
+    def play_round(monkeys, modulus=None):
+        if modulus is None:
+            modulus = lcm(*(m.test_value for m in monkeys.values()))
         for k in sorted(monkeys):
             targets = monkeys[k].take_turn(modulus)
             for kt, vt in targets.items():
@@ -117,9 +123,75 @@ class Monkey:
         )
 
 
+def track_item(monkeys, identifier, x, rounds, modulus):
+    """Follow one item for `rounds` rounds without relief
+
+    The item's next state only depends on which monkey holds it and its worry
+    modulo `modulus`, so as soon as a state at the start of a round repeats
+    the rest of the rounds are whole cycles plus a part of one.
+
+    Returns the number of inspections each monkey made of the item and the
+    `(identifier, worry)` it ends up with.
+
+    >>> monkeys = load_monkeys("data/example.txt", 1)
+    >>> track_item(monkeys, 0, 79, 10 ** 9, 96577)
+    ({0: 520467836, 3: 520467836, 1: 479532164, 2: 17543860}, (1, 88334))
+    """
+    first_seen = {}
+    states = []
+    inspected = []
+    while len(states) < rounds and (identifier, x) not in first_seen:
+        first_seen[identifier, x] = len(states)
+        states.append((identifier, x))
+        # Items thrown to a later monkey are inspected again in this round
+        round_inspected = []
+        while True:
+            round_inspected.append(identifier)
+            x, target = monkeys[identifier].inspect(x, modulus)
+            if target < identifier:
+                identifier = target
+                break
+            identifier = target
+        inspected.append(round_inspected)
+
+    counts = Counter()
+    if len(states) == rounds:
+        for round_inspected in inspected:
+            counts.update(round_inspected)
+        return dict(counts), (identifier, x)
+
+    start = first_seen[identifier, x]
+    period = len(states) - start
+    cycles, rest = divmod(rounds - start, period)
+    for round_inspected in inspected[: start + rest]:
+        counts.update(round_inspected)
+    for round_inspected in inspected[start:]:
+        for k in round_inspected:
+            counts[k] += cycles
+    return dict(counts), states[start + rest]
+
+
 def compute_business(monkeys, rounds):
-    for _ in range(rounds):
-        Monkey.play_round(monkeys)
+    """
+    >>> print(compute_business(load_monkeys("data/example.txt", 1), 10 ** 9))
+    27142382184098982504
+    """
+    modulus = lcm(*(m.test_value for m in monkeys.values()))
+    if any(m.relief_factor != 1 for m in monkeys.values()):
+        for _ in range(rounds):
+            Monkey.play_round(monkeys, modulus)
+    else:
+        # Without relief items never affect each other, so follow each one alone
+        items = [(m.identifier, x) for m in monkeys.values() for x in m.items]
+        for m in monkeys.values():
+            m.items = []
+        for identifier, x in items:
+            counts, (identifier, x) = track_item(
+                monkeys, identifier, x, rounds, modulus
+            )
+            for k, n in counts.items():
+                monkeys[k].inspections += n
+            monkeys[identifier].items.append(x)
     ordered = sorted(monkeys, key=lambda k: monkeys[k].inspections)
     return monkeys[ordered[-1]].inspections * monkeys[ordered[-2]].inspections
 
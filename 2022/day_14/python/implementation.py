@@ -130,9 +130,92 @@ class Cave:
                 return x, y
 
     def fill_with_sand(self):
-        while (pt := self.drop_sand()) is not None:
-            self.blocks[pt] = "o"
-        return sum(1 for x in self.blocks.values() if x == "o")
+        if self.has_floor:
+            return self.fill_rows()
+        return self.fill_grains()
+
+    def fill_grains(self):
+        """Drop grains until one falls into the abyss or the inlet is blocked
+
+        A grain follows the previous grain's path down to the cell above
+        where that one came to rest, so the path is kept on a stack and each
+        grain starts from its top, in a grid with one byte per cell.
+
+        >>> Cave(example_text, has_floor=True).fill_grains()
+        93
+        """
+        ex = self.extent
+        xi, yi = self.inlet
+        # Rows a grain can be in; moving below the last one means landing on
+        # the floor or falling into the abyss
+        rows = ex.y1 + 2 if self.has_floor else ex.y1 + 1
+        if self.has_floor:
+            # With a floor sand spreads at most one column per row
+            xa = min(ex.x0, xi - rows) - 1
+            xb = max(ex.x1, xi + rows) + 1
+        else:
+            xa = ex.x0 - 1
+            xb = ex.x1 + 1
+        width = xb - xa + 1
+        bottom = rows * width
+        grid = bytearray(bottom)
+        for (x, y), c in self.blocks.items():
+            if y < rows:
+                grid[y * width + x - xa] = 1
+
+        count = 0
+        inlet = yi * width + xi - xa
+        stack = [] if grid[inlet] else [inlet]
+        while stack:
+            p = stack[-1]
+            below = p + width
+            if below >= bottom:
+                if not self.has_floor:
+                    break
+            elif not grid[below]:
+                stack.append(below)
+                continue
+            elif not grid[below - 1]:
+                stack.append(below - 1)
+                continue
+            elif not grid[below + 1]:
+                stack.append(below + 1)
+                continue
+            grid[p] = 1
+            stack.pop()
+            count += 1
+            self.blocks[xa + p % width, p // width] = "o"
+        return count
+
+    def fill_rows(self):
+        """Fill a cave with a floor one row at a time
+
+        Every grain comes to rest, and a cell ends up with sand exactly when
+        it is free and sand reaches one of the three cells above it. Each row
+        is an int with a bit per column, so this is O(cells) however many
+        grains there are.
+        """
+        assert self.has_floor
+        xi, yi = self.inlet
+        rows = self.extent.y1 + 2
+        xa = xi - rows
+        rock_rows = [0] * rows
+        for (x, y), c in self.blocks.items():
+            if c == "#" and 0 <= x - xa <= 2 * rows:
+                rock_rows[y] |= 1 << (x - xa)
+
+        count = 0
+        sand = (1 << (xi - xa)) & ~rock_rows[yi]
+        for y in range(yi, rows):
+            if y > yi:
+                sand = (sand | sand << 1 | sand >> 1) & ~rock_rows[y]
+            count += sand.bit_count()
+            row = sand
+            while row:
+                j = (row & -row).bit_length() - 1
+                self.blocks[xa + j, y] = "o"
+                row &= row - 1
+        return count
 
     def find_extent(self):
         xi, yi = self.inlet
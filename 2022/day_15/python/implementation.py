@@ -1,14 +1,3 @@
-try:
-    from numba import njit
-    from numba.typed import List
-except ImportError:
-
-    def njit(x):
-        return x
-
-    List = list
-
-
 def extract(text):
     if text[-1] in ",:":
         text = text[:-1]
@@ -70,51 +59,45 @@ def load_sensors(path):
                 yield (Sensor(line))
 
 
+def covered_intervals(sensors, row):
+    """Merged half open `(start, stop)` x ranges that sensors cover on `row`
+
+    >>> sensors = list(load_sensors("data/example.txt"))
+    >>> covered_intervals(sensors, 10)
+    [(-2, 25)]
+    >>> covered_intervals(sensors, 11)
+    [(-3, 14), (15, 26)]
+    """
+    intervals = []
+    for s in sensors:
+        x0, y0 = s.location
+        rng = s.dist - abs(row - y0)
+        if rng >= 0:
+            intervals.append((x0 - rng, x0 + rng + 1))
+    intervals.sort()
+    merged = []
+    for xa, xb in intervals:
+        if merged and xa <= merged[-1][1]:
+            if xb > merged[-1][1]:
+                merged[-1] = (merged[-1][0], xb)
+        else:
+            merged.append((xa, xb))
+    return merged
+
+
 def row_coverage(sensors, row):
     """
     >>> sensors = load_sensors("data/example.txt")
     >>> row_coverage(sensors, 10)
     26
     """
-    coverage = set()
-    beacons = set()
-    for s in sensors:
-        x0, y0 = s.location
-        dist = s.dist
-        rng = dist - abs(row - y0)
-        xa = x0 - rng
-        xb = x0 + rng + 1
-        coverage.update(range(xa, xb))
-        xb, yb = s.nearest_beacon
-        if yb == row:
-            beacons.add(xb)
-    return len(coverage - beacons)
-
-
-@njit
-def _find_tuning_freq(sensor_info, max_coord):
-    for y in range(max_coord + 1):
-        bounds = [(-1, 1), (-1, -1)]
-        # Have beginning (-1) to sort before end (+1) if there's a tie
-        for x0, y0, d in sensor_info:
-            rng = d - abs(y - y0)
-            if rng >= 0:
-                xa = x0 - rng
-                xb = x0 + rng + 1
-                if xb >= 0 and xa <= max_coord + 1:
-                    bounds.append((xa, -1))
-                    bounds.append((xb, 1))
-        bounds.sort()
-        depth = 0
-        for x, delta in bounds:
-            depth -= delta
-            if x < 0:
-                continue
-            if x > max_coord:
-                break
-            if depth == 0:
-                return x * 4000000 + y
-    return -1
+    sensors = list(sensors)
+    beacons = {s.nearest_beacon[0] for s in sensors if s.nearest_beacon[1] == row}
+    return sum(xb - xa for (xa, xb) in covered_intervals(sensors, row)) - len(beacons)
+
+
+def is_covered(sensors, x, y):
+    return any(manhattan(s.location, (x, y)) <= s.dist for s in sensors)
 
 
 def find_tuning_freq(sensors, max_coord):
@@ -122,11 +105,37 @@ def find_tuning_freq(sensors, max_coord):
     >>> sensors = load_sensors("data/example.txt")
     >>> find_tuning_freq(sensors, 20)
     56000011
+
+    The only uncovered point is next to covered points on every side inside
+    the search area, so it is just outside some sensors' diamonds. Those
+    edges lie on lines `x + y = a` and `x - y = b`, and the point is where
+    two of them cross, or where one of them meets the edge of the area.
     """
-    sensor_info = List()
+    sensors = list(sensors)
+    sums = set()
+    differences = set()
     for s in sensors:
-        sensor_info.append((*s.location, s.dist))
-    return _find_tuning_freq(sensor_info, max_coord)
+        x0, y0 = s.location
+        d = s.dist + 1
+        sums.update((x0 + y0 - d, x0 + y0 + d))
+        differences.update((x0 - y0 - d, x0 - y0 + d))
+
+    candidates = {(0, 0), (0, max_coord), (max_coord, 0), (max_coord, max_coord)}
+    for a in sums:
+        for b in differences:
+            if (a - b) % 2 == 0:
+                candidates.add(((a + b) // 2, (a - b) // 2))
+    for edge in (0, max_coord):
+        for a in sums:
+            candidates.update(((edge, a - edge), (a - edge, edge)))
+        for b in differences:
+            candidates.update(((edge, edge - b), (edge + b, edge)))
+
+    for x, y in sorted(candidates):
+        if 0 <= x <= max_coord and 0 <= y <= max_coord:
+            if not is_covered(sensors, x, y):
+                return x * 4000000 + y
+    return -1
 
 
 if __name__ == "__main__":
@@ -150,45 +150,51 @@ def add_paths(nodes):
         nodes[k] = Node(label=k, flow=nodes[k].flow, dests=dests)
 
 
-def setup_nodes(graph):
-    """Convert nodes to faster form for traversal"""
-    nodes = {}
-    kmap = {k: 1 << i for (i, k) in enumerate(sorted(set(graph)))}
-    # Use a simpler data structure: k : (flow, ((d, cost), ...)
-    # Here k and d are bit field keys.
-    for k, nd in graph.items():
-        nodes[kmap[k]] = (
-            nd.flow,
-            # We always turn on a valve, so bump the cost here to save op later.
-            tuple((kmap[d], c + 1) for (d, c) in nd.dests),
-        )
-    return kmap["AA"], nodes
-
-
-def general_traverse(graph, time_left):
-    """traverse caves within time_limit trying to maximize released steam
+def intern_valves(graph, start="AA"):
+    """Number the valves with flow from 0, and put `start` after them
+
+    Returns `(flows, dist, n)` where `dist[i * n + j]` is the time to walk
+    from valve `i` to valve `j` and open it.
 
     >>> nodes = simplify(parse_graph(example_text))
     >>> add_paths(nodes)
-    >>> traverse(nodes, 30)
-    1651
+    >>> flows, dist, n = intern_valves(nodes)
+    >>> flows, dist[n * (n - 1) :]
+    ([13, 2, 20, 3, 22, 21], [2, 3, 2, 3, 6, 3, 0])
+    """
+    labels = sorted(k for (k, nd) in graph.items() if nd.flow > 0)
+    labels.append(start)
+    n = len(labels)
+    dist = [0] * (n * n)
+    for i, k in enumerate(labels):
+        dests = dict(graph[k].dests)
+        for j, d in enumerate(labels):
+            if i != j:
+                dist[i * n + j] = dests[d] + 1
+    return [graph[k].flow for k in labels[:-1]], dist, n
+
+
+def best_by_subset(graph, time_left):
+    """Most pressure released by opening exactly the valves in each subset
+
+    Subsets are bit masks over the valves numbered by `intern_valves`, and
+    subsets that can't be opened in time have 0.
     """
-    start, nodes = setup_nodes(graph)
-    state_map = {}
-    pending = [(start, time_left, 0, start)]
+    flows, dist, n = intern_valves(graph)
+    k = n - 1
+    moves = [
+        [(j, 1 << j, dist[i * n + j], flows[j]) for j in range(k)] for i in range(n)
+    ]
+    best = [0] * (1 << k)
+    pending = [(k, time_left, 0, 0)]
     while pending:
-        k, t, score, opened = pending.pop()
-        flow, dests = nodes[k]
-        score += flow * t * (k & opened == 0)
-        opened |= k
-        state = (opened, t)
-        if state_map.get(state, 0) > score:
-            continue
-        state_map[state] = score
-        for d, c in dests:
-            if d & opened == 0 and t - c > 0:
-                pending.append((d, t - c, score, opened))
-    return start, state_map
+        i, t, score, opened = pending.pop()
+        if score > best[opened]:
+            best[opened] = score
+        for j, bit, d, flow in moves[i]:
+            if not opened & bit and d < t:
+                pending.append((j, t - d, score + flow * (t - d), opened | bit))
+    return best
 
 
 def traverse(graph, time_left):
@@ -199,40 +205,30 @@ def traverse(graph, time_left):
     >>> traverse(nodes, 30)
     1651
     """
-    _, state_map = general_traverse(graph, time_left)
-    return max(state_map.values())
-
-
-def condense_state_map(state_map, start):
-    # We remove AA from the keys because that break the comparisons in part 2.
-    score_map = {}
-    for (k, t), v in state_map.items():
-        k &= ~start
-        score_map[k] = max(v, score_map.get(k, 0))
-    return score_map
+    return max(best_by_subset(graph, time_left))
 
 
 def dual_traverse(graph, time_left):
     """Find the best score for two agents traversing the caves at once
 
+    The two agents open disjoint sets of valves, so this is the best total
+    over a subset and its complement, once each subset's best is propagated
+    to all of its supersets.
+
     >>> nodes = simplify(parse_graph(example_text))
     >>> add_paths(nodes)
     >>> dual_traverse(nodes, 26)
     1707
     """
-    start, state_map = general_traverse(graph, time_left)
-    score_map = condense_state_map(state_map, start)
-    pairs = sorted(score_map.items(), key=lambda x: x[1], reverse=True)
-    best = 0
-    for i, (k1, v1) in enumerate(pairs):
-        for k2, v2 in pairs[i + 1 :]:
-            total = v1 + v2
-            if total <= best:
-                # Since pairs are sorted by reverse score, the rest of k2 won't help
-                break
-            if not k1 & k2:
-                best = max(best, total)
-    return best
+    best = best_by_subset(graph, time_left)
+    at_most = best.copy()
+    for j in range(len(best).bit_length() - 1):
+        bit = 1 << j
+        for mask in range(len(best)):
+            if mask & bit and at_most[mask ^ bit] > at_most[mask]:
+                at_most[mask] = at_most[mask ^ bit]
+    full = len(best) - 1
+    return max(score + at_most[full ^ mask] for (mask, score) in enumerate(best))
 
 
 if __name__ == "__main__":
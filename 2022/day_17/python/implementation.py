@@ -1,6 +1,3 @@
-from itertools import cycle
-
-
 def load_rocks(path):
     """
     >>> for x in load_rocks("data/rocks.txt"): print(sorted(x))
@@ -39,6 +36,26 @@ def load_winds(path):
     return winds
 
 
+def rock_mask(rock, x0=2):
+    """Pack a rock into an int, 8 bits per row with the bottom row lowest
+
+    Column `x` of the chamber is bit `6 - x` of its row, and the rock's left
+    edge starts at column `x0`.
+
+    >>> hex(rock_mask({(0, 1), (1, 0), (1, 1), (1, 2), (2, 1)}))
+    '0x81c08'
+    """
+    mask = 0
+    for x, y in rock:
+        mask |= 1 << (8 * y + 6 - x0 - x)
+    return mask
+
+
+LEFT_WALL = 0x40404040
+RIGHT_WALL = 0x01010101
+FULL_ROW = 0x7F
+
+
 class Cave:
     """
     >>> rocks = load_rocks("data/rocks.txt")
@@ -69,55 +86,88 @@ class Cave:
     width = 7
 
     def __init__(self, rocks, winds):
-        self.rocks = rocks
+        self.rocks = [rock_mask(rock) for rock in rocks]
         self.winds = winds
-        self.stack = set()
+        self.reset()
+
+    def reset(self):
+        # One byte per row, starting with the floor; only the rows that a
+        # falling rock can still touch are kept, `base` counts the others
+        self.rows = bytearray([FULL_ROW])
+        self.base = 0
 
     def render(self, height):
         lines = ["+" + "-" * self.width + "+"]
         for i in range(1, height + 1):
-            row = "|"
-            for j in range(1, self.width + 1):
-                row += "#" if (j, i) in self.stack else "."
-            row += "|"
-            lines.append(row)
+            row = self.rows[i - self.base] if i - self.base < len(self.rows) else 0
+            row = "".join("#" if row >> (6 - j) & 1 else "." for j in range(7))
+            lines.append(f"|{row}|")
         return "\n".join(lines[::-1])
 
     @property
     def height(self):
-        return max(y for (x, y) in self.stack)
-
-    def is_valid(self, rock):
-        if rock & self.stack:
-            return False
-        for x, y in rock:
-            if x <= 0 or x > 7:
-                return False
-            if y <= 0:
-                return False
-        return True
+        return self.base + len(self.rows) - 1
+
+    def trim(self):
+        """Drop the rows that no falling rock can reach
+
+        Flood fills the empty cells reachable from the top, moving down, left
+        and right, and keeps everything from the first row it cannot get past.
+        """
+        rows = self.rows
+        reach = FULL_ROW
+        for y in range(len(rows) - 1, -1, -1):
+            free = ~rows[y] & FULL_ROW
+            reach &= free
+            while True:
+                spread = (reach | reach << 1 | reach >> 1) & free
+                if spread == reach:
+                    break
+                reach = spread
+            if not reach:
+                break
+        if y:
+            del rows[:y]
+            self.base += y
 
     def _run(self):
-        self.stack.clear()
-        x0, y0 = 3, 4
-        winds = iter(enumerate(cycle(self.winds)))
-        rocks = iter(enumerate(cycle(self.rocks)))
-        rock_i, raw_rock = next(rocks)
-        rock = {(x0 + x, y0 + y) for (x, y) in raw_rock}
+        """Drop rocks forever, yielding a key for the state after each one
+
+        The key holds the next rock and wind and the reachable rows, which is
+        everything the rest of the simulation depends on.
+        """
+        self.reset()
+        rocks = self.rocks
+        winds = self.winds
+        rows = self.rows
+        rock_i = wind_i = 0
         while True:
-            wind_i, dx = next(winds)
-            candidate = {(x + dx, y) for (x, y) in rock}
-            if self.is_valid(candidate):
-                rock = candidate
-            candidate = {(x, y - 1) for (x, y) in rock}
-            if self.is_valid(candidate):
-                rock = candidate
-            else:
-                self.stack |= rock
-                yield rock_i % len(self.rocks), wind_i % len(self.winds)
-                y0 = max(y for (x, y) in self.stack) + 4
-                rock_i, raw_rock = next(rocks)
-                rock = {(x0 + x, y0 + y) for (x, y) in raw_rock}
+            rock = rocks[rock_i]
+            rock_i = (rock_i + 1) % len(rocks)
+            y = len(rows) + 3
+            while True:
+                dx = winds[wind_i]
+                wind_i = (wind_i + 1) % len(winds)
+                window = int.from_bytes(rows[y : y + 4], "little")
+                if dx < 0:
+                    if not rock & LEFT_WALL and not (rock << 1) & window:
+                        rock <<= 1
+                elif not rock & RIGHT_WALL and not (rock >> 1) & window:
+                    rock >>= 1
+                window = int.from_bytes(rows[y - 1 : y + 3], "little")
+                if rock & window:
+                    break
+                y -= 1
+            while rock:
+                if y < len(rows):
+                    rows[y] |= rock & 0xFF
+                else:
+                    rows.append(rock & 0xFF)
+                rock >>= 8
+                y += 1
+            self.trim()
+            rows = self.rows
+            yield rock_i, wind_i, bytes(rows)
 
     def run(self, n_rocks):
         for i, _ in enumerate(self._run()):
@@ -125,25 +175,19 @@ class Cave:
                 break
 
     def compute_height(self, n_rocks):
-        patterns = {}
-        reps = 2
-        for i, (rock_i, wind_i) in enumerate(self._run()):
-            if i == n_rocks:
+        """Height after `n_rocks`, skipping whole cycles of repeated states"""
+        seen = {}
+        heights = [0]
+        for n, key in enumerate(self._run(), 1):
+            heights.append(self.height)
+            if n == n_rocks:
                 return self.height
-
-            key = (rock_i, wind_i)
-            if key in patterns:
-                i0, h0, cnt = patterns[key]
-                if cnt >= reps:
-                    break
-                patterns[key] = i, self.height, cnt + 1
-            else:
-                patterns[key] = i, self.height, 0
-        i0, h0, cnt = patterns[key]
-        dn = i - i0
-        dh = self.height - h0
-        self.run(n_rocks % dn + dn)
-        return self.height + (n_rocks - dn) // dn * dh
+            if key in seen:
+                break
+            seen[key] = n
+        n0 = seen[key]
+        cycles, rest = divmod(n_rocks - n0, n - n0)
+        return heights[n0 + rest] + cycles * (self.height - heights[n0])
 
 
 if __name__ == "__main__":
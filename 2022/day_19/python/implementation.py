@@ -1,4 +1,6 @@
 from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from time import perf_counter
 
 
 def parse_blueprint(line):
@@ -40,43 +42,34 @@ def load_blueprints(path):
     return blueprints
 
 
-def upper_bound(t, costs, robots, ore):
-    """Estimate upper bound for score based on current state.
+# A state is packed into one int, with a field of `BITS` bits for each of
+# the ore, clay and obsidian stocks, then the ore, clay and obsidian robot
+# counts, then the geodes. Geode robots are not tracked: each one is credited
+# with every geode it will ever crack as soon as it is built.
+BITS = 12
+FIELD = (1 << BITS) - 1
+KINDS = ("ore", "clay", "obsidian")
+ROBOTS = 3 * BITS
+GEODES = 6 * BITS
+STOCK = (1 << ROBOTS) - 1
 
-    Whenever the real rules require us to make a choice such as
-    which robot to build or whether to use a resource for building
-    one robot or another, we do both. So:
+# Most states kept in the memo for each blueprint
+MEMO_SIZE = 1 << 18
 
-    * We can build as many robots per time step as we want
-    * Nothing requires ore
-
-    With these two constraints we can quickly determine a bound. We could
-    go further and include the dependency of clay robots on ore, but it
-    adds some complexity since we are removing the clay cost below and it
-    doesn't actually help.
 
+def pack(*fields):
+    """
+    >>> unpack(pack(1, 2, 3), 3)
+    [1, 2, 3]
     """
-    OG = ore["geode"]
-    OO = ore["obsidian"]
-    OC = ore["clay"]
-    RG = robots["geode"]
-    RO = robots["obsidian"]
-    RC = robots["clay"]
-    CGO = costs["geode"]["obsidian"]
-    COC = costs["obsidian"]["clay"]
-    while t > 0:
-        OG += RG
-        if OO >= CGO:
-            OO -= CGO
-            RG += 1
-        OO += RO
-        if OC >= COC:
-            RO += 1
-            OC -= COC
-        OC += RC
-        RC += 1
-        t -= 1
-    return OG
+    state = 0
+    for i, x in enumerate(fields):
+        state |= x << (i * BITS)
+    return state
+
+
+def unpack(state, n=7):
+    return [(state >> (i * BITS)) & FIELD for i in range(n)]
 
 
 class Factory:
@@ -98,106 +91,94 @@ class Factory:
 
     def __init__(self, costs):
         self.costs = costs
-        self.best_score = 0
-        self.states = {}
-        self.max_ore_costs = max(x["ore"] for x in self.costs.values())
+        # What each robot costs, as a packed state
+        self.packed_costs = {
+            kind: pack(*(cost.get(k, 0) for k in KINDS))
+            for (kind, cost) in costs.items()
+        }
+        # There is no point in producing more of a resource per minute than
+        # can be spent in a minute
+        self.max_robots = [max(x.get(k, 0) for x in costs.values()) for k in KINDS]
 
     def find_max_geodes(self, time):
-        robots = self.initial_robots.copy()
-        ore = {k: 0 for k in robots.keys()}
-        return self._fmg(time, self.costs, robots, ore)
-
-    def _fmg(self, time_left, costs, robots, ore):
-        if time_left == 2:
-            # No matter what, we get this much
-            geodes = ore["geode"] + 2 * robots["geode"]
-            if all(v <= ore[k] for (k, v) in costs["geode"].items()):
-                # If possible we build one more geode robot to get one more geode
-                geodes += 1
-            return geodes
-
-        # Make a key based on the current state
-        key = (time_left, frozenset(robots.items()), frozenset(ore.items()))
-        if key in self.states:
-            # We've seen this state before, so just return it's value
-            return self.states[key]
-
-        # If our score is less than our estimated upper bound give up on this path.
-        local_best_score = upper_bound(time_left, costs, robots, ore)
-        if local_best_score < self.best_score:
-            self.states[key] = -1
-            return -1
-
-        # This set of optimization were inspired by a comment on redit.
-        if robots["obsidian"] == costs["geode"]["obsidian"]:
-            if robots["ore"] >= costs["geode"]["ore"]:
-                # We can build geode robots every time now, so do that
-                g = ore["geode"] + time_left * (robots["geode"] + time_left - 1) // 2
-                self.states[key] = g
-                self.best_score = max(self.best_score, g)
-                return g
-            elif "obsidian" in costs:
-                # Remove obsidian from costs so we don't build any more.
-                costs = {k: v for (k, v) in costs.items() if k != "obsidian"}
-        if "clay" in costs and robots["clay"] == costs["obsidian"]["clay"]:
-            # Remove clay from costs so we don't build clay robots any more
-            costs = {k: v for (k, v) in costs.items() if k != "clay"}
-        if "ore" in costs and robots["ore"] == self.max_ore_costs:
-            # Remove ore from costs so we don't build ore robots any more
-            costs = {k: v for (k, v) in costs.items() if k != "ore"}
-
-        time_left -= 1
-
-        # Later on, we check if we can build a robot are based on the current
-        # ore so make a copy and update that based on the count of each robot.
-        next_ore = ore.copy()
-        for k, cnt in robots.items():
-            next_ore[k] += cnt
-
-        # If we can build a geode robot, do that.
-        geodes = self._try_build("geode", time_left, ore, next_ore, robots, costs)
-        if geodes == -1:
-            # Otherwise, try not building anything
-            geodes = self._fmg(time_left, costs, robots, next_ore)
-            # And try building the other robots *except* geode
-            for robot_type in costs:
-                if robot_type != "geode":
-                    geodes = max(
-                        geodes,
-                        self._try_build(
-                            robot_type, time_left, ore, next_ore, robots, costs
-                        ),
-                    )
-
-        # Store this state in case we see it again
-        self.states[key] = geodes
-        # Update the best score, so we can use it with upper_bound (above)
-        self.best_score = max(self.best_score, geodes)
+        self.best_score = 0
+        state = pack(0, 0, 0, *(self.initial_robots[k] for k in KINDS))
+        # The memo is dropped with the search, and is least recently used
+        # first when it is full
+        search = lru_cache(maxsize=MEMO_SIZE)(self._search)
+        self._memo_search = search
+        try:
+            return search(time, state)
+        finally:
+            del self._memo_search
+
+    def upper_bound(self, time_left, state):
+        """Most geodes we could end with if ore were free
+
+        Without ore the only choices are whether to spend clay on an obsidian
+        robot and obsidian on a geode robot, and it never hurts to do both, so
+        build a clay robot every minute and the others whenever possible.
+        """
+        _, clay, obsidian, _, clay_robots, obsidian_robots, geodes = unpack(state)
+        clay_cost = self.costs["obsidian"]["clay"]
+        obsidian_cost = self.costs["geode"]["obsidian"]
+        for t in range(time_left - 1, 0, -1):
+            if obsidian >= obsidian_cost:
+                obsidian -= obsidian_cost
+                geodes += t
+            obsidian += obsidian_robots
+            if clay >= clay_cost:
+                clay -= clay_cost
+                obsidian_robots += 1
+            clay += clay_robots
+            clay_robots += 1
         return geodes
 
-    def _try_build(self, robot_type, time_left, ore, next_ore, robots, costs):
-        robot_cost = costs[robot_type]
-        if all(v <= ore[k] for (k, v) in robot_cost.items()):
-            # We can build this type of robot, so let's try!
-            # We need to copy any objects we are going to modify
-            # so we don't mess them up for other paths.
-            local_ore = next_ore.copy()
-            for k, v in robot_cost.items():
-                local_ore[k] -= v
-            local_robots = robots.copy()
-            local_robots[robot_type] += 1
-            return self._fmg(
-                time_left,
-                costs,
-                local_robots,
-                local_ore,
-            )
-        else:
-            return -1
+    def _search(self, time_left, state):
+        """Most geodes we can end with, jumping from one robot build to the next"""
+        best = state >> GEODES
+        if best > self.best_score:
+            self.best_score = best
+        if time_left <= 1 or self.upper_bound(time_left, state) <= self.best_score:
+            return best
+
+        stock = unpack(state, 6)
+        production = (state >> ROBOTS) & STOCK
+        for kind in ("geode", "obsidian", "clay", "ore"):
+            if kind != "geode":
+                k = KINDS.index(kind)
+                if stock[3 + k] >= self.max_robots[k]:
+                    continue
+            # Wait until we can afford the robot, then a minute to build it
+            wait = 0
+            for k, cost in enumerate(KINDS):
+                need = self.costs[kind].get(cost, 0) - stock[k]
+                if need > 0:
+                    rate = stock[3 + k]
+                    if rate == 0:
+                        break
+                    wait = max(wait, -(-need // rate))
+            else:
+                wait += 1
+                if wait >= time_left:
+                    continue
+                next_state = state + production * wait - self.packed_costs[kind]
+                if kind == "geode":
+                    next_state += (time_left - wait) << GEODES
+                else:
+                    next_state += 1 << (ROBOTS + KINDS.index(kind) * BITS)
+                best = max(best, self._memo_search(time_left - wait, next_state))
+        return best
+
+
+def _timed_max_geodes(blueprint, time):
+    t0 = perf_counter()
+    geodes = Factory(blueprint).find_max_geodes(time)
+    return geodes, perf_counter() - t0
 
 
 def find_max_geodes_24(blueprint):
-    return Factory(blueprint).find_max_geodes(24)
+    return _timed_max_geodes(blueprint, 24)
 
 
 def compute_total_quality(blueprints):
@@ -205,15 +186,15 @@ def compute_total_quality(blueprints):
     keys = list(blueprints)
     args = [blueprints[k] for k in keys]
     with ProcessPoolExecutor() as exe:
-        for k, g in zip(keys, exe.map(find_max_geodes_24, args)):
+        for k, (g, dt) in zip(keys, exe.map(find_max_geodes_24, args)):
             q = k * g
-            print(k, g, q)
+            print(k, g, q, f"({dt:.2f}s)")
             total_quality += q
     return total_quality
 
 
 def find_max_geodes_32(blueprint):
-    return Factory(blueprint).find_max_geodes(32)
+    return _timed_max_geodes(blueprint, 32)
 
 
 def compute_geode_product(blueprints):
@@ -222,8 +203,8 @@ def compute_geode_product(blueprints):
     assert keys == [1, 2, 3][: len(keys)], keys
     args = [blueprints[k] for k in keys]
     with ProcessPoolExecutor() as exe:
-        for k, g in zip(keys, exe.map(find_max_geodes_32, args)):
-            print(k, g)
+        for k, (g, dt) in zip(keys, exe.map(find_max_geodes_32, args)):
+            print(k, g, f"({dt:.2f}s)")
             prod *= g
     return prod
 
@@ -1,4 +1,5 @@
 from collections import deque
+from math import isqrt
 
 example_text = """
 1
@@ -37,24 +38,72 @@ def mix(numbers, repeats=1):
     >>> numbers = parse_text(example_text)
     >>> equiv(mix(numbers), [1, 2, -3, 4, 0, 3, -2])
     True
+    >>> coord_sum(mix(list(range(-2000, 3000)), 3))
+    2634
     """
     M = len(numbers)
     N = len(numbers) - 1
-    numbers = deque(numbers, maxlen=M)
-    indices = deque(range(M), maxlen=M)
+    if N == 0:
+        return list(numbers)
+    # The mixed order is kept as a list of blocks of original indices, about
+    # sqrt(M) of them, each about sqrt(M) long, with a Fenwick tree over the
+    # block lengths. Finding and moving an element costs a scan of one block
+    # and O(log M) tree steps.
+    size = isqrt(M)
+    n_blocks = -(-M // size)
+    top = 1 << n_blocks.bit_length()
+    blocks = [list(range(k, min(k + size, M))) for k in range(0, M, size)]
+    block_of = [k // size for k in range(M)]
+    tree = [0] * (n_blocks + 1)
     for _ in range(repeats):
+        for b, block in enumerate(blocks):
+            for i in block:
+                block_of[i] = b
+        for k in range(1, n_blocks + 1):
+            tree[k] = len(blocks[k - 1])
+        for k in range(1, n_blocks + 1):
+            if (parent := k + (k & -k)) <= n_blocks:
+                tree[parent] += tree[k]
+
         for i in range(M):
-            # Ugh N**2 performance here.
-            j = indices.index(i)
-            n = numbers[j]
-            if n != 0:
-                numbers.rotate(-j)
-                x = numbers.popleft()
-                numbers.insert(n % N, x)
-                indices.rotate(-j)
-                x = indices.popleft()
-                indices.insert(n % N, x)
-    return list(numbers)
+            n = numbers[i] % N
+            if n == 0:
+                continue
+            b = block_of[i]
+            block = blocks[b]
+            j = block.index(i)
+            del block[j]
+            # Position in the mixed order, then remove it from the tree
+            position = j
+            k = b
+            while k:
+                position += tree[k]
+                k -= k & -k
+            k = b + 1
+            while k <= n_blocks:
+                tree[k] -= 1
+                k += k & -k
+
+            # Find the block to insert into and the offset within it
+            position = (position + n) % N
+            b = 0
+            step = top
+            while step:
+                if b + step <= n_blocks and tree[b + step] < position:
+                    b += step
+                    position -= tree[b]
+                step >>= 1
+            blocks[b].insert(position, i)
+            block_of[i] = b
+            k = b + 1
+            while k <= n_blocks:
+                tree[k] += 1
+                k += k & -k
+
+        # Rebalance, as blocks drift in size as elements move between them
+        order = [i for block in blocks for i in block]
+        blocks = [order[k : k + size] for k in range(0, M, size)]
+    return [numbers[i] for block in blocks for i in block]
 
 
 def coord_sum(numbers):
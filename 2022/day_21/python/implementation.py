@@ -1,4 +1,4 @@
-import sys
+import operator
 
 example_text = """
 root: pppw + sjmn
@@ -50,76 +50,113 @@ def parse_text(text):
     return namespace
 
 
-def monkey_eval(namespace, target="root", return_ordered=False):
+OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.floordiv,
+}
+
+
+def compile_monkeys(namespace, target="root"):
+    """Return the monkeys `target` depends on as `(name, a, op, b)` jobs
+
+    Jobs are in topological order, so each one only needs the results of
+    jobs before it; monkeys that yell a number have `op` set to `None`.
+
+    >>> compile_monkeys(parse_text(example_text), "sjmn")
+    [('hmdt', 32, None, None), ('zczc', 2, None, None), \
+('drzm', 'hmdt', '-', 'zczc'), ('dbpl', 5, None, None), ('sjmn', 'drzm', '*', 'dbpl')]
+    """
+    jobs = []
+    done = set()
+    stack = [(target, False)]
+    while stack:
+        name, expanded = stack.pop()
+        if name in done:
+            continue
+        value = namespace[name]
+        if isinstance(value, int):
+            jobs.append((name, value, None, None))
+            done.add(name)
+            continue
+        a, op, b = value.split()
+        if expanded:
+            jobs.append((name, a, op, b))
+            done.add(name)
+        else:
+            stack.extend([(name, True), (b, False), (a, False)])
+    return jobs
+
+
+def monkey_eval(namespace, target="root"):
     """
     >>> monkey_eval(parse_text(example_text))
     152
     """
-    known_space = {}
-    outer_space = {}
-    for k, v in namespace.items():
-        if isinstance(v, int):
-            known_space[k] = v
-        else:
-            outer_space[k] = v
-    ordered = known_space.copy()
-
-    while True:
-        if target in known_space:
-            if return_ordered:
-                return ordered
-            else:
-                return known_space[target]
-        for k in list(outer_space):
-            expr = outer_space[k]
-            try:
-                v = eval(expr, {}, known_space)
-            except (NameError, TypeError):
-                pass
-            else:
-                if isinstance(v, (int, float)):
-                    if v % 1 == 0:
-                        v = int(v)
-                    known_space[k] = v
-                    ordered[k] = expr
-                    del outer_space[k]
-                    break
-
-
-def human_eval(namespace, low=0, high=10000000000000):
-    # # low=3460000000000, high=3460000001000):
-    # 1000000000000
-    # 3460000001000
-    """
+    values = {}
+    for name, a, op, b in compile_monkeys(namespace, target):
+        values[name] = a if op is None else OPERATORS[op](values[a], values[b])
+    return values[target]
+
+
+def human_eval(namespace, human="humn"):
+    """Find the number `human` must yell for both sides of `root` to match
+
+    Evaluates everything that does not depend on `human`, then walks down the
+    path from `root` to `human`, undoing one operation at a time.
+
     >>> human_eval(parse_text(example_text))
     301
+    >>> text = "root: aaaa + bbbb\\naaaa: humn * cccc\\ncccc: 3\\nbbbb: 10\\nhumn: 5"
+    >>> human_eval(parse_text(text))
+    Traceback (most recent call last):
+    ...
+    AssertionError
     """
-    namespace = monkey_eval(namespace, return_ordered=True)
+    jobs = compile_monkeys(namespace)
+    values = {}
+    depends = {human}
+    for name, a, op, b in jobs:
+        if name == human:
+            continue
+        if op is None:
+            values[name] = a
+        elif a in depends or b in depends:
+            depends.add(name)
+        else:
+            values[name] = OPERATORS[op](values[a], values[b])
+
     a, _, b = namespace["root"].split()
-    namespace["root"] = f"{a} - {b}"
-
-    def heval(x):
-        namespace["humn"] = x
-        return monkey_eval(namespace)
-
-    # Assume monotonic
-    L = heval(low)
-    H = heval(high)
-    while True:
-        mid = (low + high) // 2
-        M = heval(mid)
-        if M == 0:
-            return mid
-        elif L * M < 0:
-            # This contains our point
-            high = mid
-        elif M * H < 0:
-            # nope this
-            low = mid
+    name, result = (a, values[b]) if a in depends else (b, values[a])
+    while name != human:
+        a, op, b = namespace[name].split()
+        if a in depends:
+            name, x = a, values[b]
+            match op:
+                case "+":
+                    result -= x
+                case "-":
+                    result += x
+                case "*":
+                    result, rest = divmod(result, x)
+                    assert rest == 0
+                case "/":
+                    result *= x
         else:
-            # :-(
-            print(low, mid, high, L, M, H)
-            raise ValueError("didn't converge")
+            name, x = b, values[a]
+            match op:
+                case "+":
+                    result -= x
+                case "-":
+                    result = x - result
+                case "*":
+                    result, rest = divmod(result, x)
+                    assert rest == 0
+                case "/":
+                    result, rest = divmod(x, result)
+                    assert rest == 0
+    return result
 
 
 if __name__ == "__main__":
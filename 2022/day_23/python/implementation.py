@@ -1,4 +1,4 @@
-from collections import defaultdict, deque
+from collections import deque
 from sys import maxsize
 
 example_text = """
@@ -25,20 +25,51 @@ class Board:
     |.#..#..|
     """
 
+    # Empty cells kept around the elves when the board has to grow
+    margin = 16
+
     def __init__(self, text):
         self.initial_board = self.parse(text)
         self.reset()
 
     def reset(self):
-        self.board = self.initial_board.copy()
-        self.moves = deque(
-            [
-                ((-1, -1), (-1, 0), (-1, 1)),
-                ((1, -1), (1, 0), (1, 1)),
-                ((-1, -1), (0, -1), (1, -1)),
-                ((-1, 1), (0, 1), (1, 1)),
-            ]
-        )
+        self.place(self.initial_board)
+        self.moves = deque("NSWE")
+
+    def place(self, elves):
+        """Store the elves as one int, bit `i * width + j` for row `i`, column `j`
+
+        `origin` holds the board coordinates of bit 0, and the outermost rows
+        and columns are always left empty, so shifting by one column never
+        wraps an elf around into the next row.
+        """
+        ivals = [i for (i, j) in elves]
+        jvals = [j for (i, j) in elves]
+        self.origin = (min(ivals) - self.margin, min(jvals) - self.margin)
+        self.height = max(ivals) - min(ivals) + 1 + 2 * self.margin
+        self.width = max(jvals) - min(jvals) + 1 + 2 * self.margin
+        i0, j0 = self.origin
+        self.cells = 0
+        for i, j in elves:
+            self.cells |= 1 << ((i - i0) * self.width + j - j0)
+        row = (1 << self.width) - 1
+        edges = 1 | 1 << (self.width - 1)
+        self.border = row | row << ((self.height - 1) * self.width)
+        for i in range(self.height):
+            self.border |= edges << (i * self.width)
+
+    @property
+    def board(self):
+        """The set of elf positions"""
+        i0, j0 = self.origin
+        elves = set()
+        for i in range(self.height):
+            row = self.cells >> (i * self.width) & ((1 << self.width) - 1)
+            while row:
+                j = (row & -row).bit_length() - 1
+                elves.add((i0 + i, j0 + j))
+                row &= row - 1
+        return elves
 
     def move_elves(self, rounds):
         """
@@ -88,47 +119,48 @@ class Board:
         >>> board.reset()
         >>> board.move_elves(maxsize)
         20
-        """
-
-        def has_neighbors(r0, c0):
-            for dr in [-1, 0, 1]:
-                for dc in [-1, 0, 1]:
-                    if not (dr == dc == 0):
-                        r1, c1 = r0 + dr, c0 + dc
-                        if (r1, c1) in self.board:
-                            return True
-            return False
-
-        def no_elves(r0, c0, move_set):
-            for dr, dc in move_set:
-                r1, c1 = r0 + dr, c0 + dc
-                if (r1, c1) in self.board:
-                    # Oh no an elf!
-                    return False
-            return True
 
+        Each round works on every elf at once: shifting the whole board by a
+        neighbour's offset marks each cell with an elf in that direction.
+        """
         for n in range(rounds):
-            proposals = defaultdict(list)
-            for r, c in self.board:
-                if has_neighbors(r, c):
-                    for move_set in self.moves:
-                        if no_elves(r, c, move_set):
-                            _, (dr, dc), _ = move_set
-                            r1, c1 = r + dr, c + dc
-                            proposals[(r1, c1)].append((r, c))
-                            break
-            proposals = dict(proposals)
-            someone_moved = False
-            for k, v in proposals.items():
-                if len(v) == 1:
-                    r1, c1 = k
-                    [(r, c)] = v
-                    self.board.remove((r, c))
-                    self.board.add((r1, c1))
-                    someone_moved = True
-            if not someone_moved:
+            if self.cells & self.border:
+                self.place(self.board)
+            cells = self.cells
+            w = self.width
+
+            # Bits set for cells that have an elf to the north, north-east, ...
+            n_, s_ = cells << w, cells >> w
+            w_, e_ = cells << 1, cells >> 1
+            nw, ne = cells << (w + 1), cells << (w - 1)
+            sw, se = cells >> (w - 1), cells >> (w + 1)
+            free = {
+                "N": ~(n_ | ne | nw),
+                "S": ~(s_ | se | sw),
+                "W": ~(w_ | nw | sw),
+                "E": ~(e_ | ne | se),
+            }
+            waiting = cells & (n_ | s_ | w_ | e_ | nw | ne | sw | se)
+            proposed = {}
+            for d in self.moves:
+                proposed[d] = waiting & free[d]
+                waiting &= ~proposed[d]
+
+            # Elves can only clash when coming from opposite sides
+            north, south = proposed["N"] >> w, proposed["S"] << w
+            west, east = proposed["W"] >> 1, proposed["E"] << 1
+            clash = (north & south) | (west & east)
+            north &= ~clash
+            south &= ~clash
+            west &= ~clash
+            east &= ~clash
+            moved = north | south | west | east
+            if not moved:
                 return n + 1
+            left = (north << w) | (south >> w) | (west << 1) | (east >> 1)
+            self.cells = cells & ~left | moved
             self.moves.rotate(-1)
+        return rounds
 
     @staticmethod
     def parse(text):
@@ -142,22 +174,24 @@ class Board:
 
     @property
     def extent(self):
-        ivals = [i for (i, j) in self.board]
-        jvals = [j for (i, j) in self.board]
+        board = self.board
+        ivals = [i for (i, j) in board]
+        jvals = [j for (i, j) in board]
         return min(ivals), max(ivals) + 1, min(jvals), max(jvals) + 1
 
     @property
     def blank_space(self):
         i0, i1, j0, j1 = self.extent
-        return (i1 - i0) * (j1 - j0) - len(self.board)
+        return (i1 - i0) * (j1 - j0) - self.cells.bit_count()
 
     def __str__(self):
+        board = self.board
         i0, i1, j0, j1 = self.extent
         text = ""
         for i in range(i0, i1):
             text += "|"
             for j in range(j0, j1):
-                text += "#" if ((i, j) in self.board) else "."
+                text += "#" if ((i, j) in board) else "."
             text += "|\n"
         return text[:-1]
 
@@ -1,5 +1,5 @@
-from bisect import insort_left
-from collections import defaultdict, deque
+from collections import defaultdict
+from math import lcm
 
 example_text = """
 #.######
@@ -34,11 +34,14 @@ class Valley:
 
     def __init__(self, text):
         self.board = self.parse(text)
+        self.initial_board = self.board
         self.max_i = max(i for (i, _) in self.board)
         self.max_j = max(j for (_, j) in self.board)
         self.start_loc = (0, 1)
         self.end_loc = (self.max_i, self.max_j - 1)
         self.loc = self.start_loc
+        self.time = 0
+        self.build_free_cells()
 
     def parse(self, text):
         text = text.strip()
@@ -49,6 +52,50 @@ class Valley:
                     board[i, j] = c
         return board
 
+    def build_free_cells(self):
+        """Precompute the blizzard free cells for every time in one period
+
+        Cells inside the walls are bits of a single int, bit `i * stride + j`
+        for cell `(i + 1, j + 1)`; the extra bit on each row is always clear,
+        so shifting by one column never wraps into the next row. Blizzards
+        moving along a row are rotations of that row's mask, and those moving
+        along a column are whole rows moved up or down.
+        """
+        height = self.max_i - 1
+        width = self.max_j - 1
+        self.stride = stride = width + 1
+        self.period = lcm(height, width)
+        row_mask = (1 << width) - 1
+        masks = {c: [0] * height for c in "><v^"}
+        for (i, j), c in self.initial_board.items():
+            if c in masks:
+                masks[c][i - 1] |= 1 << (j - 1)
+        self.interior = sum(row_mask << (i * stride) for i in range(height))
+
+        def rotate(x, n):
+            n %= width
+            return (x << n | x >> (width - n)) & row_mask
+
+        self.free_cells = []
+        for t in range(self.period):
+            blocked = 0
+            for i in range(height):
+                row = (
+                    rotate(masks[">"][i], t)
+                    | rotate(masks["<"][i], -t)
+                    | masks["v"][(i - t) % height]
+                    | masks["^"][(i + t) % height]
+                )
+                blocked |= row << (i * stride)
+            self.free_cells.append(self.interior & ~blocked)
+
+    def bit(self, loc):
+        """The bit for a cell inside the walls, or 0 for anywhere else"""
+        i, j = loc
+        if 0 < i < self.max_i and 0 < j < self.max_j:
+            return 1 << ((i - 1) * self.stride + j - 1)
+        return 0
+
     def traverse(self, start, end):
         """
         >>> v = Valley(example_text)
@@ -56,28 +103,49 @@ class Valley:
         >>> len(path)
         18
         >>> path
-        'vvW^>>v<^>Wvv>>>vv'
+        'Wv^v^WWv>>Wvv>>>vv'
+
+        Breadth first search where the frontier at each minute is the int of
+        cells that can be reached then. Only the frontiers are kept, and the
+        path is traced back through them once the end is reached.
         """
-        seen = set()
-        boards = {0: self.board}
-        queue = [(0, start, "")]
-        while queue:
-            t, (i, j), path = queue.pop(0)
-            if (i, j) == end:
-                self.board = boards[t]
-                return path
-            if (t + 1) not in boards:
-                boards[t + 1] = self.find_next_blizzards(boards[t])
-            next_board = boards[t + 1]
-            for mv in ">v<^W":
-                i1, j1 = self.move(i, j, mv)
-                if (i1, j1) not in next_board and 0 <= i1 <= self.max_i:
-                    # Blizzards and walls are not allowed
-                    new_state = (t + 1, i1, j1)
-                    if new_state not in seen:
-                        queue.append((t + 1, (i1, j1), path + mv))
-                        seen.add(new_state)
-        raise RuntimeError("coud not traverse valley")
+        stride = self.stride
+        entry = self.inside(start)
+        exit_ = self.inside(end)
+        entry_bit = self.bit(entry)
+        exit_bit = self.bit(exit_)
+
+        frontiers = [0]
+        t = self.time
+        while not frontiers[-1] & exit_bit:
+            t += 1
+            f = frontiers[-1]
+            frontier = f | f << 1 | f >> 1 | f << stride | f >> stride
+            # Waiting at the start is always possible, so it can be entered
+            frontier = (frontier | entry_bit) & self.free_cells[t % self.period]
+            if len(frontiers) > self.period and frontier == frontiers[-self.period]:
+                raise RuntimeError("coud not traverse valley")
+            frontiers.append(frontier)
+
+        # Walk back from the exit through cells reachable a minute earlier
+        path = ["^" if end[0] == 0 else "v"]
+        loc = exit_
+        for frontier in reversed(frontiers[:-1]):
+            for mv, back in zip(">v<^W", "<^>vW"):
+                previous = self.move(*loc, back)
+                if previous == start or frontier & self.bit(previous):
+                    break
+            path.append(mv)
+            loc = previous
+
+        self.time = t + 1
+        self.board = self.blizzards_at(self.time)
+        return "".join(reversed(path))
+
+    def inside(self, loc):
+        """The cell inside the walls next to an opening"""
+        i, j = loc
+        return (1, j) if i == 0 else (self.max_i - 1, j)
 
     def simple_traverse(self):
         return self.traverse(self.start_loc, self.end_loc)
@@ -94,6 +162,20 @@ class Valley:
         p3 = self.traverse(self.start_loc, self.end_loc)
         return p1 + p2 + p3
 
+    def blizzards_at(self, t):
+        """The board after `t` minutes, like `t` calls of `find_next_blizzards`"""
+        board = {}
+        for (i, j), state in self.initial_board.items():
+            if state == "#":
+                board[i, j] = "#"
+                continue
+            for c in state:
+                di, dj = self.move(0, 0, c)
+                i1 = (i - 1 + di * t) % (self.max_i - 1) + 1
+                j1 = (j - 1 + dj * t) % (self.max_j - 1) + 1
+                board[i1, j1] = board.get((i1, j1), "") + c
+        return board
+
     def move(self, i, j, c):
         match c:
             case ">":
@@ -1,5 +1,4 @@
-from functools import cache
-from multiprocessing import Pool
+from multiprocessing import Pool, cpu_count
 
 
 def parse(text):
@@ -14,36 +13,45 @@ def parse(text):
     return records
 
 
-@cache
-def _count_valid(seq, counts):
-    if not counts:
-        return 0 if ('#' in seq) else 1
-    if len(seq) - seq.count('.') < sum(counts):
-        return 0
-    first_known_dot = seq.index('.')
-    required = counts[0]
-    if first_known_dot < required:
-        if '#' in seq[:first_known_dot]:
-            return 0
-        else:
-            return _count_valid(seq[first_known_dot + 1 :], counts)
-    available = first_known_dot - required + 1
-    count = 0
-    for i in range(available):
-        break_available = seq[i + required] != '#'
-        if break_available:
-            count += _count_valid(seq[i + required + 1 :], counts[1:])
-        if seq[i] == '#':
-            # Can't proceed since current count _must_ start here
-            return count
-    return count + _count_valid(seq[available:], counts)
+def count_valid(record):
+    """Count the arrangements of damaged springs that fit `record`
 
+    Works back from the end of the record, one group at a time, keeping a
+    table of the number of ways the remaining groups fit from each offset.
 
-def count_valid(record):
+    >>> count_valid(('?###????????', (3, 2, 1)))
+    10
+    >>> count_valid(unfold('????.######..#####.', (1, 6, 5)))
+    2500
+    """
     seq, counts = record
-    # Ensure all sequences end with '.' so can remove check in _count_valid
+    # Ensure all sequences end with '.' so a group never runs off the end
     seq = seq.lstrip('.') + '.'
-    return _count_valid(seq, counts)
+    n = len(seq)
+    # run[i] is the length of the stretch of unknown or damaged springs at i
+    run = [0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        run[i] = 0 if seq[i] == '.' else run[i + 1] + 1
+
+    # ways[i] counts the arrangements of the groups placed so far in seq[i:]
+    ways = [0] * (n + 2)
+    ways[n] = 1
+    for i in range(n - 1, -1, -1):
+        ways[i] = 0 if seq[i] == '#' else ways[i + 1]
+    for required in reversed(counts):
+        next_ways = ways
+        ways = [0] * (n + 2)
+        for i in range(n - required - 1, -1, -1):
+            count = 0 if seq[i] == '#' else ways[i + 1]
+            if run[i] >= required and seq[i + required] != '#':
+                count += next_ways[i + required + 1]
+            ways[i] = count
+    return ways[0]
+
+
+def estimated_cost(record):
+    seq, counts = record
+    return len(seq) * len(counts)
 
 
 def part_1(text):
@@ -73,8 +81,13 @@ def part_2(text, use_multiprocessing=True):
     records = parse(text)
     records = [unfold(record, counts) for record, counts in records]
     if use_multiprocessing:
-        with Pool(8) as p:
-            return sum(p.imap_unordered(count_valid, records, chunksize=10))
+        # Hand out the most expensive records first, in chunks small enough
+        # that the workers finish at about the same time
+        records.sort(key=estimated_cost, reverse=True)
+        processes = cpu_count()
+        chunksize = max(1, len(records) // (4 * processes))
+        with Pool(processes) as p:
+            return sum(p.imap_unordered(count_valid, records, chunksize=chunksize))
     else:
         return sum(map(count_valid, records))
 
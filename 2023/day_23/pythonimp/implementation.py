@@ -1,6 +1,6 @@
 from collections import deque
-from math import inf, isinf
-from multiprocessing import Pool
+from math import inf
+from multiprocessing import Pool, Value, cpu_count
 
 
 def render(board, path=()):
@@ -58,10 +58,7 @@ slippery_deltas = {
     '.': [(0, 1), (1, 0), (0, -1), (-1, 0)],
 }
 
-DEFAULT_MAX_QUEUE_SIZE = 256
-
-
-def part_1(text, max_queue_size=inf):
+def part_1(text, use_multiprocessing=True):
     """
     >>> part_1(EXAMPLE_TEXT)
     94
@@ -70,7 +67,7 @@ def part_1(text, max_queue_size=inf):
     """
     board = parse(text)
     edges, start, end = board_to_graph(board, slippery_deltas)
-    return find_longest_path_edges(edges, start, end, max_queue_size=max_queue_size)
+    return find_longest_path_edges(edges, start, end, use_multiprocessing)
 
 
 boring_deltas = {
@@ -182,94 +179,149 @@ def simplify_edges(edges, start, end):
     return new_edges
 
 
-def build_initial_state(edges, start, end):
+def build_junction_graph(edges, start, end):
+    """Number the junctions from 0 and fold the fixed corridors at either end
+
+    Every path runs from `start` to its only neighbouring junction, `source`,
+    and finishes from the only junction next to `end`, `target`. Returns
+    `(neighbours, in_weights, source, target, base_length, visited)`, where
+    `neighbours[i]` lists `(j, 1 << j, weight)`, `in_weights[j]` is the
+    longest edge into `j` and `visited` marks `start`, `source` and `end`.
+
+    >>> edges, start, end = board_to_graph(parse(EXAMPLE_TEXT), boring_deltas)
+    >>> graph = build_junction_graph(edges, start, end)
+    >>> len(graph[0]), graph[2:5]
+    (9, (2, 7, 20))
+    """
     raw_edges = simplify_edges(edges, start, end)
-    raw_nodes = set()
-    for a, b, _ in raw_edges:
-        raw_nodes.add(a)
-        raw_nodes.add(b)
-    node_map = {x: 1 << i for (i, x) in enumerate(sorted(raw_nodes))}
-    edges = []
+    nodes = sorted(set(x for (a, b, _) in raw_edges for x in (a, b)))
+    index = {x: i for (i, x) in enumerate(nodes)}
+    neighbours = [[] for _ in nodes]
+    in_weights = [0] * len(nodes)
     for a, b, w in raw_edges:
-        edges.append((node_map[a], node_map[b], w))
-    start = node_map[start]
-    end = node_map[end]
+        a, b = index[a], index[b]
+        neighbours[a].append((b, 1 << b, w))
+        in_weights[b] = max(in_weights[b], w)
+    # Try the longest corridors first, so good bounds are found early
+    for targets in neighbours:
+        targets.sort(key=lambda x: x[2])
+
+    start, end = index[start], index[end]
+    [(source, _, start_cost)] = neighbours[start]
+    [(target, _, end_cost)] = neighbours[end]
+    visited = 1 << start | 1 << source | 1 << end
+    return neighbours, in_weights, source, target, start_cost + end_cost, visited
+
+
+def reachable_bound(graph, node, visited):
+    """Upper bound on the length still to be walked from `node`
+
+    Each junction that can still be reached without crossing `visited` is
+    entered at most once, along its longest edge. Returns -1 if the target
+    cannot be reached at all.
+    """
+    neighbours, in_weights, _, target, _, _ = graph
+    total = 0
+    frontier = [node]
+    while frontier:
+        for next_node, bit, _ in neighbours[frontier.pop()]:
+            if not bit & visited:
+                visited |= bit
+                total += in_weights[next_node]
+                frontier.append(next_node)
+    return total if visited >> target & 1 else -1
+
+
+def search(graph, stack, best=0, budget=inf, shared_best=None):
+    """Depth first search from the `(length, visited, node)` states on `stack`
+
+    Expands at most `budget` states and returns `(best, stack)`, with the
+    best length found so far and the states still left to explore. States
+    that cannot beat the best length, also counting `shared_best` when given,
+    are pruned.
+    """
+    neighbours, _, _, target, _, _ = graph
+    while stack and budget > 0:
+        budget -= 1
+        if shared_best is not None and budget % 1024 == 0:
+            best = max(best, shared_best.value)
+        length, visited, node = stack.pop()
+        if node == target:
+            if length > best:
+                best = length
+                if shared_best is not None:
+                    with shared_best.get_lock():
+                        shared_best.value = max(shared_best.value, best)
+            continue
+        if length + reachable_bound(graph, node, visited) <= best:
+            continue
+        for next_node, bit, weight in neighbours[node]:
+            if not bit & visited:
+                stack.append((length + weight, visited | bit, next_node))
+    return best, stack
 
-    source_to_targets = {v: [] for (i, v) in enumerate(node_map.values())}
-    for source, target, weight in edges:
-        source_to_targets[source].append((target, weight))
 
-    [(adjacent_to_start, start_cost)] = source_to_targets[start]
-    [(adjacent_to_end, end_cost)] = source_to_targets[end]
+# The junction graph and the shared best length, set once per worker process
+_graph = None
+_shared_best = None
 
-    initial_visited = start | adjacent_to_start
-    queue = deque([(start_cost + end_cost, initial_visited, adjacent_to_start)])
-    max_length = 0
 
-    return queue, adjacent_to_end, max_length, source_to_targets, {}
+def _init_worker(graph, shared_best):
+    global _graph, _shared_best
+    _graph = graph
+    _shared_best = shared_best
 
 
-def traverse_from_state(state):
-    queue, adjacent_to_end, max_length, source_to_targets, seen = state
-    seen = seen.copy()
-    while queue:
-        path_length, visited, node = queue.pop()
-        key = (visited, node)
-        if seen.get(key, -1) >= path_length:
-            continue
-        seen[key] = path_length
-        if node == adjacent_to_end:
-            max_length = max(max_length, path_length)
-        else:
-            for next_node, weight in source_to_targets[node]:
-                if not next_node & visited:
-                    next_visited = visited | next_node
-                    next_path_length = path_length + weight
-                    queue.append((next_path_length, next_visited, next_node))
-    return max_length
-
-
-def find_longest_path_edges(edges, start, end, max_queue_size):
-    state = build_initial_state(edges, start, end)
-    if isinf(max_queue_size):
-        return traverse_from_state(state)
-    queue, *other_state = traverse_warmup_state(state, max_queue_size=max_queue_size)
-    args = [(deque([x]),) + tuple(other_state) for x in queue]
-    if len(args) == 0:
-        return other_state[-3]
-    with Pool() as p:
-        return max(p.imap_unordered(traverse_from_state, args))
-
-
-def traverse_warmup_state(state, max_queue_size):
-    queue, adjacent_to_end, max_length, source_to_targets, seen = state
-
-    while queue and len(queue) < max_queue_size:
-        path_length, visited, node = queue.popleft()
-        if seen.get((visited, node), -1) >= path_length:
-            continue
-        seen[(visited, node)] = path_length
-        if node == adjacent_to_end:
-            max_length = max(max_length, path_length)
-        else:
-            for next_node, weight in source_to_targets[node]:
-                if not next_node & visited:
-                    next_visited = visited | next_node
-                    next_path_length = path_length + weight
-                    queue.append((next_path_length, next_visited, next_node))
-    return queue, adjacent_to_end, max_length, source_to_targets, seen
+def _search_task(args):
+    stack, budget = args
+    return search(_graph, stack, _shared_best.value, budget, _shared_best)
+
 
+DEFAULT_BUDGET = 20_000
 
-def part_2(text, max_queue_size=DEFAULT_MAX_QUEUE_SIZE):
+
+def find_longest_path_edges(edges, start, end, use_multiprocessing=True, budget=None):
+    """Length of the longest path from `start` to `end` visiting no node twice
+
+    Workers search a piece of the DFS stack for `budget` expansions at a time
+    and hand back what they did not get to, which is split up again whenever
+    there are fewer pieces in flight than two per worker.
     """
-    >>> part_2(EXAMPLE_TEXT, max_queue_size=1)
+    graph = build_junction_graph(edges, start, end)
+    _, _, source, _, base_length, visited = graph
+    stack = [(base_length, visited, source)]
+    if not use_multiprocessing:
+        best, _ = search(graph, stack, budget=budget or inf)
+        return best
+
+    budget = budget or DEFAULT_BUDGET
+    processes = cpu_count()
+    shared_best = Value('q', 0)
+    with Pool(processes, _init_worker, (graph, shared_best)) as p:
+        pending = deque([p.apply_async(_search_task, ((stack, budget),))])
+        while pending:
+            _, stack = pending.popleft().get()
+            if len(pending) < 2 * processes and len(stack) > 1:
+                pieces = [stack[0::2], stack[1::2]]
+            else:
+                pieces = [stack] if stack else []
+            for piece in pieces:
+                pending.append(p.apply_async(_search_task, ((piece, budget),)))
+        return shared_best.value
+
+
+def part_2(text, use_multiprocessing=True, budget=None):
+    """
+    >>> part_2(EXAMPLE_TEXT, use_multiprocessing=False)
+    154
+    >>> part_2(EXAMPLE_TEXT, budget=1)
     154
     >>> part_2(INPUT_TEXT)
     6718
     """
     board = parse(text)
     edges, start, end = board_to_graph(board, boring_deltas)
-    return find_longest_path_edges(edges, start, end, max_queue_size=max_queue_size)
+    return find_longest_path_edges(edges, start, end, use_multiprocessing, budget)
 
 
 if __name__ == "__main__":